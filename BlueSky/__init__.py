@@ -11,10 +11,15 @@ __maintainer__ = "Cline"
 
 __contributors__ = {}
 
+import sys
+from importlib import reload
+# On first load the submodule isn't imported yet, so there's nothing to reload
+_reloading = __name__ + '.plugin' in sys.modules
+
 from . import config
 from . import plugin
-from importlib import reload
-reload(plugin) # In case we're being reloaded.
+if _reloading:
+    reload(plugin) # In case we're being reloaded.
 
 Class = plugin.Class
 configure = config.configure
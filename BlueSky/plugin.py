@@ -1,12 +1,53 @@
 import supybot.callbacks as callbacks
+import supybot.conf as conf
 import supybot.ircmsgs as ircmsgs
 from supybot.commands import *
 import supybot.log as log
 import re
+import html
+import threading
 import requests
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
+try:
+    # Optional: a much faster C parser for the fallback path
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
 from urllib.parse import urlparse
 
+# One pooled session for every preview so connections to bsky.app stay warm
+# between messages. Worker threads share it; the urllib3 pool is thread-safe.
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=10, pool_maxsize=20,
+    max_retries=Retry(total=2, backoff_factor=0.3)))
+_SESSION.headers['User-Agent'] = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
+
+# CSS selectors for the meta tags the preview reads, keyed by property/name
+_META_SELECTORS = (
+    ('og:description', 'meta[property="og:description"]'),
+    ('description', 'meta[name="description"]'),
+    ('og:title', 'meta[property="og:title"]'),
+    ('article:published_time', 'meta[name="article:published_time"]'),
+)
+
+# Everything the preview needs is in <head>; stop reading the body after
+# this many (decompressed) bytes if </head> hasn't turned up yet
+_MAX_HEAD_BYTES = 64 * 1024
+# After the head, read up to this many more bytes to finish the response so
+# its connection goes back to the pool; a longer body is dropped along with
+# its connection instead
+_MAX_DRAIN_BYTES = 64 * 1024
+
+# How many successful previews are kept for links that get pasted again
+_PREVIEW_CACHE_MAX = 512
+
 class BlueSky(callbacks.Plugin):
     """BlueSky link preview plugin for Supybot/Limnoria.
     
@@ -16,8 +57,9 @@ class BlueSky(callbacks.Plugin):
     3. Adding the post's publication date
     4. Formatting everything into a clean, single-line response
     
-    The plugin uses BeautifulSoup for HTML parsing and handles various error cases
-    gracefully with appropriate logging.
+    Meta tags are pulled out of the raw page with a regex scan; BeautifulSoup (lxml
+    parser) is only used as a fallback for markup the scan can't handle. Various
+    error cases are handled gracefully with appropriate logging.
     """
     threaded = True
 
@@ -25,24 +67,82 @@ class BlueSky(callbacks.Plugin):
         super().__init__(irc)
         # Matches BlueSky post URLs in the format: https://bsky.app/profile/user/post/id
         self.bsky_pattern = re.compile(r'https?://(?:www\.)?bsky\.app/profile/[^/]+/post/[^/\s]+')
-        # Matches embedded content indicators like "[contains quote post]"
-        self.quote_pattern = re.compile(r'\[contains (?:quote|post|embedded content)[^\]]*\]')
+        # Matches line breaks and embedded content indicators like "[contains quote post]"
+        # so both can be cleaned out of a description in a single pass
+        self.clean_pattern = re.compile(r'\n\n?|\[contains (?:quote|post|embedded content)[^\]]*\]')
+        # Matches a whole <meta ...> tag in the raw page bytes (quoted values may contain '>')
+        self.meta_pattern = re.compile(rb'<meta\b((?:"[^"]*"|\'[^\']*\'|[^\'">])*)>', re.I)
+        # Matches a single name="value" attribute inside a meta tag, in either quoting style
+        self.attr_pattern = re.compile(rb'([\w:-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+        # doPrivmsg runs on the main IRC thread, so fetches happen here instead.
+        # Several links in one message are fetched concurrently.
+        self.executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='BlueSky')
+        # Posts can't be edited, so a link that gets pasted again is answered
+        # from memory instead of being fetched and parsed again. URL -> preview,
+        # least recently used first; filled from the fetch workers, hence the lock
+        self._preview_cache = OrderedDict()
+        self._preview_cache_lock = threading.Lock()
+        # doPrivmsg sees every message on every channel, so keep the enabled
+        # channels as a set and only rebuild it when the config changes
+        self.enabled_channels = frozenset(self.registryValue('enabledChannels'))
+        self._enabled_callback = self._update_enabled_channels
+        conf.supybot.plugins.BlueSky.enabledChannels.addCallback(self._enabled_callback)
+
+    def die(self):
+        """Stop the fetch workers when the plugin is unloaded."""
+        conf.supybot.plugins.BlueSky.enabledChannels.removeCallback(self._enabled_callback)
+        self.executor.shutdown(wait=False)
+        super().die()
+
+    def _update_enabled_channels(self):
+        """Registry callback: rebuild the enabled channel set."""
+        self.enabled_channels = frozenset(self.registryValue('enabledChannels'))
 
     def doPrivmsg(self, irc, msg):
         """Handle incoming IRC messages by checking for BlueSky URLs."""
         channel = msg.args[0]
-        enabled_channels = self.registryValue('enabledChannels')
-        
-        if channel not in enabled_channels:
+        if channel not in self.enabled_channels:
             return
             
         message = msg.args[1]
-        matches = self.bsky_pattern.finditer(message)
-        
-        for match in matches:
-            url = match.group(0)
+        # Cheap substring test so most messages never reach the regex engine
+        if 'bsky.app' not in message:
+            return
+        urls = [match.group(0) for match in self.bsky_pattern.finditer(message)]
+        if not urls:
+            return
+
+        futures = [self.executor.submit(self._fetch_preview_cached, url) for url in urls]
+        # Queued after its fetches, so by the time a worker picks this up every
+        # fetch it waits on has already started (the pool's queue is FIFO).
+        self.executor.submit(self._reply_previews, irc, futures)
+
+    def _fetch_preview_cached(self, url):
+        """_fetch_preview, answered from _preview_cache when the link was seen before.
+
+        Only successful previews are kept, so a post that timed out or failed
+        to parse is tried again the next time it's pasted.
+        """
+        cache = self._preview_cache
+        with self._preview_cache_lock:
+            preview = cache.get(url)
+            if preview is not None:
+                cache.move_to_end(url)
+                return preview
+        preview = self._fetch_preview(url)
+        if preview:
+            with self._preview_cache_lock:
+                cache[url] = preview
+                cache.move_to_end(url)
+                if len(cache) > _PREVIEW_CACHE_MAX:
+                    cache.popitem(last=False)
+        return preview
+
+    def _reply_previews(self, irc, futures):
+        """Reply with each fetched preview, in the order the links were posted."""
+        for future in futures:
             try:
-                preview = self._fetch_preview(url)
+                preview = future.result()
                 if preview:
                     irc.reply(preview, prefixNick=False)
             except requests.RequestException as e:
@@ -64,38 +164,26 @@ class BlueSky(callbacks.Plugin):
         The returned string format is:
         "Post content -- Author (@handle.bsky.social) [YYYY-MM-DD]"
         """
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Extract post content and author info
-        post_content = None
-        author_info = None
-        timestamp = None
-        
-        # Try to get content from meta tags
-        for meta in soup.find_all('meta'):
-            if meta.get('property') == 'og:description' or meta.get('name') == 'description':
-                content = meta.get('content')
-                if content:
-                    # Remove newlines and quote indicators
-                    content = content.replace('\n\n', ' ').replace('\n', ' ')
-                    content = self.quote_pattern.sub('', content).strip()
-                    post_content = content
-            elif meta.get('name') == 'article:published_time':
-                # Extract date portion (YYYY-MM-DD) from timestamp
-                timestamp = meta.get('content', '').split('T')[0]
+        with _SESSION.get(url, timeout=10, stream=True) as response:
+            response.raise_for_status()
+            page = self._read_head(response)
         
+        meta = self._scan_meta_tags(page)
+        if not (meta.get('og:description') or meta.get('description')) or not meta.get('og:title'):
+            # Odd markup the scan couldn't handle; let a real parser have a go
+            meta = self._parse_meta_tags(page)
+
+        post_content = meta.get('og:description') or meta.get('description')
+        if post_content:
+            # Replace newlines with spaces and drop quote indicators
+            post_content = self.clean_pattern.sub(self._clean_repl, post_content).strip()
+
         # Get author info from og:title
-        title_meta = soup.find('meta', property='og:title')
-        if title_meta:
-            author_info = title_meta.get('content')
-        
+        author_info = meta.get('og:title')
+
+        # Extract date portion (YYYY-MM-DD) from timestamp
+        timestamp = meta.get('article:published_time', '').split('T')[0]
+
         if not post_content or not author_info:
             return None
             
@@ -105,4 +193,82 @@ class BlueSky(callbacks.Plugin):
         else:
             return f"{post_content} -- {author_info}"
 
+    def _read_head(self, response):
+        """Read a streamed response only up to the end of its <head> section.
+
+        A short remainder is read and thrown away so the connection can be
+        reused; see _MAX_DRAIN_BYTES.
+
+        Returns:
+            bytes: The page up to and including </head>, or the first
+            _MAX_HEAD_BYTES bytes if it's missing
+        """
+        chunks = response.iter_content(chunk_size=8192)
+        page = bytearray()
+        head = None
+        for chunk in chunks:
+            # Only search the new chunk (plus enough overlap for a split tag)
+            start = max(len(page) - len(b'</head>'), 0)
+            page += chunk
+            end = page.find(b'</head>', start)
+            if end != -1:
+                head = bytes(page[:end + len(b'</head>')])
+                break
+            if len(page) >= _MAX_HEAD_BYTES:
+                break
+        if head is None:
+            head = bytes(page[:_MAX_HEAD_BYTES])
+        drained = 0
+        for chunk in chunks:
+            drained += len(chunk)
+            if drained > _MAX_DRAIN_BYTES:
+                break
+        return head
+
+    @staticmethod
+    def _clean_repl(match):
+        """Substitution for clean_pattern: a space for newlines, nothing for indicators."""
+        return ' ' if match.group(0)[0] == '\n' else ''
+
+    def _scan_meta_tags(self, page):
+        """Extract meta tag contents from raw HTML bytes without building a tree.
+
+        Returns:
+            dict: Mapping of meta property/name to its unescaped content
+        """
+        meta = {}
+        for tag in self.meta_pattern.finditer(page):
+            attrs = {}
+            for attr in self.attr_pattern.finditer(tag.group(1)):
+                value = attr.group(2) if attr.group(2) is not None else attr.group(3)
+                attrs[attr.group(1).lower()] = value
+            key = attrs.get(b'property') or attrs.get(b'name')
+            content = attrs.get(b'content')
+            if key and content is not None:
+                meta[key.decode('utf-8', 'replace')] = html.unescape(content.decode('utf-8', 'replace'))
+        return meta
+
+    def _parse_meta_tags(self, page):
+        """Fallback for _scan_meta_tags that runs the page through a real HTML parser.
+
+        Uses selectolax (Lexbor) when it's installed, otherwise BeautifulSoup.
+        """
+        meta = {}
+        if LexborHTMLParser is not None:
+            tree = LexborHTMLParser(page)
+            for key, selector in _META_SELECTORS:
+                node = tree.css_first(selector)
+                if node is not None and node.attributes.get('content') is not None:
+                    meta[key] = node.attributes['content']
+            return meta
+
+        # Feed raw bytes with an explicit encoding so bs4 skips charset sniffing
+        soup = BeautifulSoup(page, 'lxml', from_encoding='utf-8')
+        # Look up just the tags we need instead of walking every <meta>
+        for key, selector in _META_SELECTORS:
+            tag = soup.select_one(selector)
+            if tag and tag.get('content') is not None:
+                meta[key] = tag.get('content')
+        return meta
+
 Class = BlueSky
@@ -5,8 +5,33 @@ import supybot.ircutils as ircutils
 import supybot.callbacks as callbacks
 import supybot.world as world
 import supybot.log as log
-from datetime import datetime
-import pytz
+import builtins
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from datetime import datetime, timezone
+from operator import itemgetter
+
+# One pooled session for all API calls so the TLS connection to Kalshi is
+# reused between commands. Worker threads share it; the urllib3 pool is
+# thread-safe.
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=10, pool_maxsize=20,
+    max_retries=Retry(total=2, backoff_factor=0.3)))
+
+_SEARCH_URL = "https://api.elections.kalshi.com/v1/search/series"
+# Fixed search parameters; only the query changes per call
+_SEARCH_PARAMS = {
+    "order_by": "querymatch",
+    "page_size": 5,
+    "fuzzy_threshold": 4
+}
+
+# Colored price-change templates, built once instead of per market
+_DELTA_UP = ircutils.mircColor("+{}¢", 'green')
+_DELTA_DOWN = ircutils.mircColor("{}¢", 'red')
 
 class Kalshi(callbacks.Plugin):
     """Kalshi Prediction Market IRC Bot Plugin"""
@@ -15,16 +40,6 @@ class Kalshi(callbacks.Plugin):
     def __init__(self, irc):
         super().__init__(irc)
     
-    def _shorten_url(self, url):
-        """Helper method to shorten URL using TinyURL service"""
-        try:
-            import pyshorteners
-            shortener = pyshorteners.Shortener()
-            return shortener.tinyurl.short(url)
-        except Exception as e:
-            log.error('Kalshi: Failed to shorten URL: %s', str(e))
-            return url
-    
     def kalshi(self, irc, msg, args, query_string):
         """<query>
         
@@ -32,18 +47,10 @@ class Kalshi(callbacks.Plugin):
         Example: kalshi house seats
         """
         try:
-            import requests  # Import here to allow for better reloading
-            
-            url = "https://api.elections.kalshi.com/v1/search/series"
-            params = {
-                "query": query_string,
-                "order_by": "querymatch",
-                "page_size": 5,
-                "fuzzy_threshold": 4
-            }
+            params = {**_SEARCH_PARAMS, "query": query_string}
             
-            log.debug('Kalshi: Making API request to %s with params: %r', url, params)
-            response = requests.get(url, params=params)
+            log.debug('Kalshi: Making API request to %s with params: %r', _SEARCH_URL, params)
+            response = _SESSION.get(_SEARCH_URL, params=params, timeout=10)
             
             if response.status_code != 200:
                 log.error('Kalshi: API request failed with status %d: %s', response.status_code, response.text)
@@ -51,8 +58,8 @@ class Kalshi(callbacks.Plugin):
                 return
                 
             try:
-                data = response.json()
-            except ValueError as e:
+                data = orjson.loads(response.content)
+            except ValueError as e:  # orjson.JSONDecodeError subclasses ValueError
                 log.error('Kalshi: Failed to parse API response as JSON: %s. Response text: %s', str(e), response.text)
                 irc.reply("Error: Invalid response from API")
                 return
@@ -61,20 +68,21 @@ class Kalshi(callbacks.Plugin):
                 irc.reply("No results found.")
                 return
             
-            # Find the first open series
-            now = datetime.now(pytz.UTC)
-            
-            open_series = None
-            for series in data['current_page']:
-                # Check if any market in the series is currently open
-                if series.get('markets'):
-                    for market in series['markets']:
-                        open_time = datetime.strptime(market['open_ts'], "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=pytz.UTC)
-                        if open_time <= now:
-                            open_series = series
-                            break
-                    if open_series:
-                        break
+            # Find the first open series. open_ts is fixed-width ISO-8601 UTC,
+            # so comparing the raw strings orders them the same as datetimes.
+            now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+            
+            # A series is open if any of its markets has opened; next() stops
+            # at the first hit. Use builtins.any because the supybot.commands
+            # wildcard import shadows any.
+            open_series = next(
+                (
+                    series
+                    for series in data['current_page']
+                    if builtins.any(market['open_ts'] <= now for market in series.get('markets') or ())
+                ),
+                None,
+            )
             
             if not open_series:
                 irc.reply("No currently open markets found.")
@@ -103,41 +111,38 @@ class Kalshi(callbacks.Plugin):
             # Get markets and sort by yes_bid price
             if top_series.get('markets'):
                 markets = top_series['markets']
-                # Filter for markets with active prices and sort by yes_bid
-                active_markets = [m for m in markets if m.get('yes_bid', 0) > 0]
-                sorted_markets = sorted(active_markets, key=lambda x: x.get('yes_bid', 0), reverse=True)
+                # Pull the fields we display out of each market once, keep only
+                # markets with active prices and sort by yes_bid
+                rows = [
+                    (m.get('yes_bid') or 0, m.get('yes_subtitle', 'No subtitle'), m.get('price_delta', 0))
+                    for m in markets
+                ]
+                active_rows = [row for row in rows if row[0] > 0]
+                active_rows.sort(key=itemgetter(0), reverse=True)
                 
-                # Format market outcomes
-                market_parts = []
-                for market in sorted_markets[:8]:
-                    subtitle = market.get('yes_subtitle', 'No subtitle')
-                    current_price = market.get('yes_bid', 'N/A')
-                    price_delta = market.get('price_delta', 0)
-                    
+                # Format market outcomes. They share the header's separator, so
+                # they go straight into output_parts for the single final join.
+                for current_price, subtitle, price_delta in active_rows[:8]:
                     # Format price changes with colors
                     if price_delta > 0:
-                        delta_str = ircutils.mircColor(f"+{price_delta}¢", 'green')
+                        delta_str = _DELTA_UP.format(price_delta)
                     elif price_delta < 0:
-                        delta_str = ircutils.mircColor(f"{price_delta}¢", 'red')
+                        delta_str = _DELTA_DOWN.format(price_delta)
                     else:
-                        delta_str = f"±{price_delta}¢"
+                        delta_str = "±0¢"
                     
-                    market_parts.append(f"{subtitle}: {current_price}¢ ({delta_str})")
-                
-                if market_parts:
-                    output_parts.append(" | ".join(market_parts))
+                    output_parts.append(f"{subtitle}: {current_price}¢ ({delta_str})")
                 
                 # If there are more markets with non-zero prices, add count
-                remaining = len([m for m in markets if m.get('yes_bid', 0) > 0]) - 8
+                remaining = len(active_rows) - 8
                 if remaining > 0:
                     output_parts.append(f"(+{remaining} more)")
             
-            # Add shortened URL using series_ticker
+            # Add market URL using series_ticker. These are already short, so
+            # they're not sent through a URL shortener (an extra round-trip).
             market_url = f"https://kalshi.com/markets/{top_series.get('series_ticker', '')}"
             log.debug('Kalshi: Constructing URL: %s', market_url)
-            short_url = self._shorten_url(market_url)
-            log.debug('Kalshi: Shortened URL: %s', short_url)
-            output_parts.append(short_url)
+            output_parts.append(market_url)
             
             # Send single combined message
             irc.reply(" | ".join(output_parts))
@@ -343,6 +343,19 @@ conf.registerChannelValue(
     ),
 )
 
+conf.registerGlobalValue(
+    OpenRouter,
+    "response_cache_size",
+    registry.NonNegativeInteger(
+        128,
+        _(
+            """
+            How many replies to remember for repeated identical requests. Only requests with temperature 0 and no web search are cached. 0 to disable.
+            """
+        ),
+    ),
+)
+
 conf.registerChannelValue(
     OpenRouter,
     "nick_include",
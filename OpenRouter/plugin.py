@@ -30,14 +30,49 @@
 from supybot import utils, plugins, ircutils, callbacks
 from supybot.commands import *  # getopts, rest, somethingWithoutSpaces, etc.
 from supybot.i18n import PluginInternationalization
+import hashlib
+import logging
 import re
-from collections import defaultdict
+import threading
+from collections import OrderedDict, deque
+from itertools import islice
 from datetime import date
-from openai import OpenAI
-import json
+from urllib.parse import urlparse
+from openai import BadRequestError, OpenAI
+import orjson
 
 _ = PluginInternationalization("OpenRouter")
 
+# Keywords (matched anywhere, like a substring test) or a YYYY-MM-DD date that
+# suggest a prompt needs fresh information. One alternation scans the text once.
+_TIME_SENSITIVE_RE = re.compile(
+    r"latest|today|yesterday|tomorrow|this week|current|breaking|news|price"
+    r"|stock|weather|score|release|ceo|as of|right now"
+    r"|\b\d{4}-\d{2}-\d{2}\b",
+    re.IGNORECASE,
+)
+
+# Runs of line breaks, folded to a single space when replies aren't kept intact
+_NEWLINE_RUN = re.compile(r"[\r\n]+")
+
+# Seconds to wait on the API before giving up, so a stalled request can't
+# hold a command thread for the client library's default ten minutes
+_REQUEST_TIMEOUT = 120.0
+
+# Annotation keys that may hold a source URL, in order of preference
+_URL_KEYS = ("url", "source", "link")
+
+# Hosts (and their subdomains) known to accept stream_options; other
+# OpenAI-compatible servers may answer it with a 400, so they get a plain
+# stream without usage figures
+_STREAM_USAGE_HOSTS = (".openrouter.ai", ".api.openai.com")
+
+
+def _accepts_stream_options(base_url):
+    """True if `base_url` points at one of _STREAM_USAGE_HOSTS."""
+    host = (urlparse(base_url or "").hostname or "").lower()
+    return ("." + host).endswith(_STREAM_USAGE_HOSTS)
+
 
 class OpenRouter(callbacks.Plugin):
     """Use an OpenAI‑compatible Chat Completion API via OpenRouter (or any compatible endpoint)."""
@@ -47,66 +82,115 @@ class OpenRouter(callbacks.Plugin):
 
     def __init__(self, irc):
         super().__init__(irc)
-        # maps (channel, qualifier) → list[dict]
-        self.history = defaultdict(list)
+        # maps (channel, qualifier) → deque[dict], bounded to max_history turns
+        self.history = {}
+        # API client shared across calls so its connection pool stays warm;
+        # rebuilt by _get_client when api_key/base_url change
+        self._client = None
+        self._client_key = None
+        # (raw models_blacklist tuple, lowercased frozenset) so the set is only
+        # rebuilt when the configured list changes
+        self._blacklist_cache = (None, frozenset())
+        # channel → ((template, nick, date), substituted system prompt)
+        self._system_prompt_cache = {}
+        # request digest → raw reply text, least recently used first
+        self._response_cache = OrderedDict()
+        self._response_cache_lock = threading.Lock()
+
+    def die(self):
+        """Close the shared API client (and its connection pool) on unload."""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+        super().die()
 
     # ---------------------------- helpers ----------------------------- #
 
-    def _get_param(self, opts, name, channel):
-        """Return `name` from opts if present, else the channel registry default."""
-        if name == "temperature" and "temp" in opts:
-            return opts["temp"]
-        return opts.get(name, self.registryValue(name, channel))
+    def _get_client(self, api_key, base_url):
+        """Return the shared API client, rebuilding it if the endpoint config changed."""
+        client_key = (api_key, base_url)
+        client = self._client
+        if client is None or client_key != self._client_key:
+            if client is not None:
+                client.close()
+            client = OpenAI(
+                api_key=client_key[0],
+                base_url=client_key[1],
+                timeout=_REQUEST_TIMEOUT,
+            )
+            self._client, self._client_key = client, client_key
+        return client
+
+    def _system_prompt(self, channel, template, nick):
+        """Return the dated system prompt for `channel`, rebuilt only when its inputs change."""
+        inputs = (template, nick, date.today())
+        cached = self._system_prompt_cache.get(channel)
+        if cached is None or cached[0] != inputs:
+            prompt = template.replace("$botnick", nick)
+            prompt = f"Current date: {inputs[2].isoformat()}\n{prompt}"
+            cached = self._system_prompt_cache[channel] = (inputs, prompt)
+        return cached[1]
+
+    def _info_logging(self):
+        """Return True if any handler will emit this plugin's INFO records.
+
+        supybot keeps its loggers at the lowest level and filters in the
+        handlers, so self.log.isEnabledFor() is always true.
+        """
+        logger = self.log
+        while logger:
+            for handler in logger.handlers:
+                if handler.level <= logging.INFO:
+                    return True
+            if not logger.propagate:
+                break
+            logger = logger.parent
+        return False
+
+    def _get_blacklist(self):
+        """Return the configured model blacklist as a lowercased frozenset."""
+        raw = tuple(self.registryValue("models_blacklist") or ())
+        if raw != self._blacklist_cache[0]:
+            self._blacklist_cache = (raw, frozenset(m.lower() for m in raw))
+        return self._blacklist_cache[1]
 
-    def _history_key(self, channel, model_name, alias_name):
+    def _history_key(self, scope, channel, model_name, msg):
         """Return the key object used to segregate chat histories."""
-        scope = self.registryValue("contextScope", channel).lower()
+        scope = scope.lower()
         if scope == "channel":
             return (channel, None)
         if scope == "channel+alias":
+            # alias name is the first token after the bot nick, e.g. in "@grok" or "@claude"
+            alias_name = (
+                msg.args[1].lstrip().partition(" ")[0]
+                if msg.args and len(msg.args) > 1
+                else None
+            )
             return (channel, alias_name or model_name)
         # default ⇒ channel+model
         return (channel, model_name)
 
+    def _recent_history(self, key, max_history):
+        """Return an iterator over the last `max_history` messages stored under `key`."""
+        hist = self.history.get(key)
+        if not hist:
+            return iter(())
+        return islice(hist, max(len(hist) - max_history, 0), None)
+
     def _append_history(self, key, user_msg, assistant_msg, max_history):
-        hist = self.history[key]
-        hist.extend([
-            {"role": "user", "content": user_msg},
-            {"role": "assistant", "content": assistant_msg},
-        ])
-        # trim if needed
-        excess = max(len(hist) - max_history * 2, 0)
-        if excess:
-            del hist[:excess]
+        # A bounded deque drops the oldest messages itself; rebuild it if the
+        # configured max_history has changed since it was created
+        maxlen = max(max_history, 0) * 2
+        hist = self.history.get(key)
+        if hist is None or hist.maxlen != maxlen:
+            hist = self.history[key] = deque(hist or (), maxlen=maxlen)
+        hist.append({"role": "user", "content": user_msg})
+        hist.append({"role": "assistant", "content": assistant_msg})
 
     def _is_time_sensitive(self, text):
         if not text:
             return False
-        lowered = text.lower()
-        keywords = [
-            "latest",
-            "today",
-            "yesterday",
-            "tomorrow",
-            "this week",
-            "current",
-            "breaking",
-            "news",
-            "price",
-            "stock",
-            "weather",
-            "score",
-            "release",
-            "ceo",
-            "as of",
-            "right now",
-        ]
-        if any(k in lowered for k in keywords):
-            return True
-        # YYYY-MM-DD
-        if re.search(r"\b\d{4}-\d{2}-\d{2}\b", lowered):
-            return True
-        return False
+        return _TIME_SENSITIVE_RE.search(text) is not None
 
     def _strip_urls_and_citations(self, text):
         if not text:
@@ -127,6 +211,143 @@ class OpenRouter(callbacks.Plugin):
         text = re.sub(r"\s+\n", "\n", text)
         return text.strip()
 
+    def _strip_citations_safely(self, text):
+        try:
+            return self._strip_urls_and_citations(text)
+        except Exception as e:
+            self.log.info("OpenRouter citation stripping failed: %s", e)
+            return text
+
+    def _strip_nick(self, text, nick):
+        """Drop a leading "botnick:" (plus one optional space) from `text`."""
+        nick_prefix = nick + ":"
+        if text.startswith(nick_prefix):
+            text = text[len(nick_prefix):]
+            if text.startswith(" "):
+                text = text[1:]
+        return text
+
+    def _format_sources(self, annotations):
+        """Return a "Sources: …" line for the annotation URLs, or None."""
+        if not annotations:
+            return None
+        try:
+            urls = [
+                url
+                for url in (
+                    next(filter(None, map(ann.get, _URL_KEYS)), None)
+                    for ann in annotations
+                    if isinstance(ann, dict)
+                )
+                if url
+            ]
+        except Exception as e:
+            self.log.info("OpenRouter source append failed: %s", e)
+            return None
+        return "Sources: " + " ".join(urls) if urls else None
+
+    def _log_response(self, completion_id, model, finish_reason, usage, created, annotations):
+        """Log response metadata and any annotations (sources) at INFO."""
+        try:
+            self.log.info(
+                "OpenRouter response ← id=%s model=%s finish=%s tokens=(%s, %s, %s) created=%s",
+                completion_id,
+                model,
+                finish_reason,
+                getattr(usage, "prompt_tokens", None),
+                getattr(usage, "completion_tokens", None),
+                getattr(usage, "total_tokens", None),
+                created,
+            )
+        except Exception as e:
+            self.log.info("OpenRouter response (metadata logging failed): %s", e)
+        if annotations:
+            try:
+                self.log.info(
+                    "OpenRouter annotations: %s", orjson.dumps(annotations).decode()
+                )
+            except Exception as e:
+                self.log.info("OpenRouter annotations logging failed: %s", e)
+
+    def _iter_stream(self, stream, meta):
+        """Yield the text deltas of a streamed completion as they arrive.
+
+        Response metadata (id, model, created, usage, finish reason and any
+        annotations) is collected into `meta` along the way.
+        """
+        annotations = meta.setdefault("annotations", [])
+        for chunk in stream:
+            meta["id"] = getattr(chunk, "id", None)
+            meta["model"] = getattr(chunk, "model", None)
+            meta["created"] = getattr(chunk, "created", None)
+            # Only the final chunk carries usage (stream_options.include_usage)
+            usage = getattr(chunk, "usage", None)
+            if usage:
+                meta["usage"] = usage
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            finish_reason = getattr(choice, "finish_reason", None)
+            if finish_reason:
+                meta["finish_reason"] = finish_reason
+            delta = choice.delta
+            annotations.extend(getattr(delta, "annotations", None) or ())
+            if delta.content:
+                yield delta.content
+
+    def _reply_lines(self, irc, pieces, prefix_flag, strip_nick):
+        """Reply with each line of `pieces` (text fragments) as soon as it is complete.
+
+        Returns the raw text and the list of lines as sent.
+        """
+        raw = []
+        sent = []
+        buffer = ""
+        reply = irc.reply
+
+        def _send(line):
+            if strip_nick and not sent:
+                line = self._strip_nick(line, irc.nick)
+            sent.append(line)
+            if line:
+                reply(line, prefixNick=prefix_flag)
+
+        for piece in pieces:
+            raw.append(piece)
+            buffer += piece
+            *lines, buffer = buffer.split("\n")
+            for line in lines:
+                _send(line.rstrip("\r"))
+        if buffer:
+            _send(buffer.rstrip("\r"))
+        return "".join(raw), sent
+
+    def _response_cache_key(self, request_params):
+        """Return a digest identifying a request for the response cache, or None."""
+        try:
+            # The requesting user doesn't change the answer
+            payload = {k: v for k, v in request_params.items() if k != "user"}
+            return hashlib.blake2b(
+                orjson.dumps(payload, option=orjson.OPT_SORT_KEYS), digest_size=16
+            ).digest()
+        except Exception as e:
+            self.log.info("OpenRouter response cache key failed: %s", e)
+            return None
+
+    def _cache_get(self, cache_key):
+        with self._response_cache_lock:
+            content = self._response_cache.get(cache_key)
+            if content is not None:
+                self._response_cache.move_to_end(cache_key)
+            return content
+
+    def _cache_put(self, cache_key, content, max_size):
+        with self._response_cache_lock:
+            self._response_cache[cache_key] = content
+            self._response_cache.move_to_end(cache_key)
+            while len(self._response_cache) > max_size:
+                self._response_cache.popitem(last=False)
+
     # ---------------------------- command ----------------------------- #
 
     _OPTSPEC = {
@@ -153,13 +374,23 @@ class OpenRouter(callbacks.Plugin):
         defaults for this single call.
         """
 
-        # list → dict and strip any accidental leading dashes
-        opts = {opt.lstrip("-"): val for opt, val in opts}
-
         channel = msg.channel if irc.isChannel(msg.channel) else msg.nick
         if not self.registryValue("enabled", channel):
             return
 
+        # list → dict and strip any accidental leading dashes
+        opts = {opt.lstrip("-"): val for opt, val in opts}
+
+        registry_value = self.registryValue
+
+        def _get_param(name):
+            """Return `name` from opts if present, else the channel registry default."""
+            if name == "temperature" and "temp" in opts:
+                return opts["temp"]
+            if name in opts:
+                return opts[name]
+            return registry_value(name, channel)
+
         prompt_for_llm = (
             f"{msg.nick}: {prompt}"
             if self.registryValue("nick_include", channel)
@@ -169,59 +400,57 @@ class OpenRouter(callbacks.Plugin):
         # --------------------------------------------------------------- #
         # Build API request
         # --------------------------------------------------------------- #
-        client = OpenAI(
-            api_key=self.registryValue("api_key"),
-            base_url=self.registryValue("base_url"),
-        )
+        base_url = self.registryValue("base_url")
+        client = self._get_client(self.registryValue("api_key"), base_url)
 
-        system_prompt = self.registryValue("prompt", channel).replace(
-            "$botnick", irc.nick
+        system_prompt = self._system_prompt(
+            channel, self.registryValue("prompt", channel), irc.nick
         )
-        system_prompt = f"Current date: {date.today().isoformat()}\n{system_prompt}"
 
-        model_name = opts.get("model", self.registryValue("model", channel))
+        model_name = _get_param("model")
+        model_lower = model_name.lower() if isinstance(model_name, str) else ""
 
         # Disallow blacklisted models
         try:
-            blacklist = {m.lower() for m in (self.registryValue("models_blacklist") or [])}
+            blacklist = self._get_blacklist()
         except Exception:
-            blacklist = set()
-        if isinstance(model_name, str) and model_name.lower() in blacklist:
+            blacklist = frozenset()
+        if model_lower and model_lower in blacklist:
             irc.error(
                 f"Model '{model_name}' is disallowed by configuration. Choose a different model.")
             return
 
-        # alias name is the first token after the bot nick, e.g. in "@grok" or "@claude"
-        alias_name = msg.args[1].split()[0] if msg.args and len(msg.args) > 1 else None
-        key = self._history_key(channel, model_name, alias_name)
+        scope = self.registryValue("contextScope", channel)
+        key = self._history_key(scope, channel, model_name, msg)
         max_history = self.registryValue("max_history", channel)
 
+        # System prompt first, then history, so consecutive requests share
+        # a stable prefix that providers can serve from their prompt cache.
+        # The date in the system prompt only changes once a day.
+        # Built in place so the history is copied exactly once.
+        messages = [{"role": "system", "content": system_prompt}]
+        messages.extend(self._recent_history(key, max_history))
+        messages.append({"role": "user", "content": prompt_for_llm})
+        history_used = len(messages) - 2
+
+        # token limit handled separately below to support both names
         request_params = {
             "model": model_name,
-            "messages": self.history[key][-max_history:] + [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt_for_llm},
-            ],
+            "messages": messages,
             "user": msg.nick,
+            "temperature": _get_param("temperature"),
+            "top_p": _get_param("top_p"),
+            "presence_penalty": _get_param("presence_penalty"),
         }
-
-        for pname in (
-            "temperature",
-            "top_p",
-            # token limit handled separately to support both names
-            "presence_penalty",
-            "frequency_penalty",
-        ):
-            if pname == "frequency_penalty" and "gemini" in model_name.lower():
-                continue
-            request_params[pname] = self._get_param(opts, pname, channel)
+        if "gemini" not in model_lower:
+            request_params["frequency_penalty"] = _get_param("frequency_penalty")
 
         # Choose exactly one token limit parameter, preferring max_completion_tokens
-        mct = self._get_param(opts, "max_completion_tokens", channel)
+        mct = _get_param("max_completion_tokens")
         if isinstance(mct, int) and mct > 0:
             request_params["max_completion_tokens"] = mct
         else:
-            mt = self._get_param(opts, "max_tokens", channel)
+            mt = _get_param("max_tokens")
             if isinstance(mt, int) and mt > 0:
                 request_params["max_tokens"] = mt
 
@@ -272,100 +501,146 @@ class OpenRouter(callbacks.Plugin):
             extra_body["web_search_options"] = web_search_options
             request_params["extra_body"] = extra_body
 
-        # --------------------------------------------------------------- #
-        # Log exact request payload (always on)
-        # --------------------------------------------------------------- #
-        try:
-            scope = self.registryValue("contextScope", channel)
-            history_slice = self.history[key][-max_history:]
-            history_count = len(history_slice)
-            payload_json = json.dumps(request_params, ensure_ascii=False, separators=(",", ":"))
-            self.log.info(
-                f"OpenRouter request → base_url={self.registryValue('base_url')} "
-                f"model={model_name} scope={scope} key={key!r} "
-                f"history_used={history_count} messages_total={len(request_params.get('messages', []))} "
-                f"use_web={use_web} web_mode={web_mode} "
-                f"web_search_options={web_search_options if use_web else 'omitted'} "
-                f"payload={payload_json}"
-            )
-        except Exception as e:
-            # Fallback to repr if JSON serialization fails for any reason
-            self.log.info(
-                f"OpenRouter request (repr fallback due to {e}): {request_params!r}"
-            )
+        # Identical deterministic requests get the same answer, so replay it
+        # instead of paying for another call. Web results go stale; skip those.
+        cache_size = self.registryValue("response_cache_size")
+        cache_key = None
+        if cache_size > 0 and not use_web and request_params.get("temperature") == 0:
+            cache_key = self._response_cache_key(request_params)
+
+        show_sources = self.registryValue("web_show_sources", channel)
+        # If web sources are hidden, strip URLs/markdown citations.
+        strip_citations = use_web and not show_sources
+        strip_nick = self.registryValue("nick_strip", channel)
+        prefix_flag = self.registryValue("nick_prefix", channel)
+
+        # With reply_intact every line is sent as its own message, so stream the
+        # completion and send each line as soon as it is complete. Citation
+        # stripping has to see the whole reply (links and citation blocks can
+        # span lines), so replies that need it are still fetched in one piece.
+        reply_intact = self.registryValue("reply_intact", channel)
+        stream = reply_intact and not strip_citations
+        if stream:
+            request_params["stream"] = True
+            if _accepts_stream_options(base_url):
+                request_params["stream_options"] = {"include_usage": True}
 
         # --------------------------------------------------------------- #
-        # Call the API
+        # Log exact request payload (at INFO; skipped entirely otherwise)
         # --------------------------------------------------------------- #
-        completion = client.chat.completions.create(**request_params)
-        # Log response metadata
-        try:
-            finish_reason = None
-            if getattr(completion, "choices", None):
-                choice0 = completion.choices[0]
-                finish_reason = getattr(choice0, "finish_reason", None)
-            usage = getattr(completion, "usage", None)
-            prompt_toks = getattr(usage, "prompt_tokens", None) if usage else None
-            completion_toks = getattr(usage, "completion_tokens", None) if usage else None
-            total_toks = getattr(usage, "total_tokens", None) if usage else None
-            self.log.info(
-                f"OpenRouter response ← id={getattr(completion, 'id', None)} "
-                f"model={getattr(completion, 'model', None)} finish={finish_reason} "
-                f"tokens=({prompt_toks}, {completion_toks}, {total_toks}) "
-                f"created={getattr(completion, 'created', None)}"
-            )
-        except Exception as e:
-            self.log.info(f"OpenRouter response (metadata logging failed): {e}")
-
-        choice0 = completion.choices[0]
-        message0 = choice0.message
-        content = message0.content
-        # Log any annotations (sources) if present
-        try:
-            annotations = getattr(message0, "annotations", None)
-            if annotations:
+        log_info = self._info_logging()
+        if log_info:
+            try:
                 self.log.info(
-                    f"OpenRouter annotations: {json.dumps(annotations, ensure_ascii=False)}"
+                    "OpenRouter request → base_url=%s model=%s scope=%s key=%r "
+                    "history_used=%s messages_total=%s use_web=%s web_mode=%s "
+                    "web_search_options=%s payload=%s",
+                    base_url,
+                    model_name,
+                    scope,
+                    key,
+                    history_used,
+                    len(messages),
+                    use_web,
+                    web_mode,
+                    web_search_options if use_web else "omitted",
+                    orjson.dumps(request_params).decode(),
+                )
+            except Exception as e:
+                # Fallback to repr if JSON serialization fails for any reason
+                self.log.info(
+                    "OpenRouter request (repr fallback due to %s): %r", e, request_params
                 )
-        except Exception as e:
-            self.log.info(f"OpenRouter annotations logging failed: {e}")
-            annotations = None
-
-        # Optionally append sources
-        try:
-            if self.registryValue("web_show_sources", channel) and annotations:
-                urls = []
-                for ann in annotations:
-                    if isinstance(ann, dict):
-                        url = ann.get("url") or ann.get("source") or ann.get("link")
-                        if url:
-                            urls.append(url)
-                if urls:
-                    content = f"{content}\nSources: " + " ".join(urls)
-        except Exception as e:
-            self.log.info(f"OpenRouter source append failed: {e}")
-
-        # If web sources are hidden, strip URLs/markdown citations.
-        try:
-            if use_web and not self.registryValue("web_show_sources", channel):
-                content = self._strip_urls_and_citations(content)
-        except Exception as e:
-            self.log.info(f"OpenRouter citation stripping failed: {e}")
-
-
-        if self.registryValue("nick_strip", channel):
-            content = re.sub(rf"^{re.escape(irc.nick)}: ?", "", content)
 
         # --------------------------------------------------------------- #
-        # Send reply back to IRC
+        # Call the API
         # --------------------------------------------------------------- #
-        prefix_flag = self.registryValue("nick_prefix", channel)
-        if self.registryValue("reply_intact", channel):
-            for line in content.splitlines():
-                if line:
-                    irc.reply(line, prefixNick=prefix_flag)
+        cached = self._cache_get(cache_key) if cache_key is not None else None
+        if cached is not None:
+            completion = None
+            if log_info:
+                self.log.info("OpenRouter response served from cache")
         else:
-            irc.reply(" ".join(content.splitlines()), prefixNick=prefix_flag)
+            try:
+                completion = client.chat.completions.create(**request_params)
+            except BadRequestError as e:
+                if not stream:
+                    raise
+                # Not every compatible endpoint can stream; ask for the
+                # whole reply instead
+                self.log.info(
+                    "OpenRouter streamed request rejected, retrying without streaming: %s", e
+                )
+                del request_params["stream"]
+                request_params.pop("stream_options", None)
+                stream = False
+                completion = client.chat.completions.create(**request_params)
+
+        if stream:
+            meta = {}
+            pieces = (
+                (cached,) if completion is None else self._iter_stream(completion, meta)
+            )
+            raw_content, sent = self._reply_lines(irc, pieces, prefix_flag, strip_nick)
+            annotations = meta.get("annotations")
+            if log_info and completion is not None:
+                self._log_response(
+                    meta.get("id"),
+                    meta.get("model"),
+                    meta.get("finish_reason"),
+                    meta.get("usage"),
+                    meta.get("created"),
+                    annotations,
+                )
+            if show_sources:
+                sources = self._format_sources(annotations)
+                if sources:
+                    irc.reply(sources, prefixNick=prefix_flag)
+                    sent.append(sources)
+            content = "\n".join(sent)
+        else:
+            if completion is None:
+                raw_content, annotations = cached, None
+            else:
+                choice0 = completion.choices[0]
+                message0 = choice0.message
+                raw_content = message0.content
+                annotations = getattr(message0, "annotations", None)
+                if log_info:
+                    self._log_response(
+                        getattr(completion, "id", None),
+                        getattr(completion, "model", None),
+                        getattr(choice0, "finish_reason", None),
+                        getattr(completion, "usage", None),
+                        getattr(completion, "created", None),
+                        annotations,
+                    )
+            content = raw_content
+
+            # Optionally append sources
+            if show_sources:
+                sources = self._format_sources(annotations)
+                if sources:
+                    content = f"{content}\n{sources}"
+
+            if strip_citations:
+                content = self._strip_citations_safely(content)
+
+            if strip_nick:
+                content = self._strip_nick(content, irc.nick)
+
+            # ----------------------------------------------------------- #
+            # Send reply back to IRC
+            # ----------------------------------------------------------- #
+            if reply_intact:
+                for line in content.splitlines():
+                    if line:
+                        irc.reply(line, prefixNick=prefix_flag)
+            else:
+                irc.reply(_NEWLINE_RUN.sub(" ", content).strip(), prefixNick=prefix_flag)
+
+        if cache_key is not None and completion is not None and raw_content:
+            self._cache_put(cache_key, raw_content, cache_size)
 
         # --------------------------------------------------------------- #
         # Save conversation history
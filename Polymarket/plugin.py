@@ -8,7 +8,7 @@ Implementation notes and gotchas:
 - Search flow uses the optimized public-search endpoint first and falls back to
   the plain endpoint if no events are returned. Optimized results sometimes omit
   fields such as `clobTokenIds`; `_ensure_clob_ids` enriches them via detail endpoints.
-- Markets can present missing or stringified arrays. `_as_list` normalizes these,
+- Markets can present missing or stringified arrays. `_as_list`/`_market_list` normalize these,
   and pricing falls back to `bestAsk`/`bestBid`/`lastTradePrice` for Yes/No markets.
 - URL shortening is optional. `_shorten_url` tries TinyURL with fallbacks; it logs
   and returns the full URL when shortening is unavailable.
@@ -24,30 +24,197 @@ import supybot.log as log
 import requests
 import builtins
 import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse, quote
 import warnings
 import pyshorteners
+from requests.adapters import HTTPAdapter
 from requests.exceptions import Timeout, ConnectionError
+from urllib3.util.retry import Retry
+try:
+    # Optional: decodes the (often large) event payloads several times faster.
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError, so the except
+    # clauses below catch either.
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+try:
+    # Optional: lets the session ask for brotli, which compresses the JSON
+    # payloads noticeably better than gzip. urllib3 decodes it transparently.
+    import brotli
+except ImportError:
+    brotli = None
 
 # Suppress InsecureRequestWarning
 warnings.filterwarnings('ignore', message='Unverified HTTPS request')
 
+# One pooled session for all API calls so the TLS connections to the gamma
+# and clob hosts are reused across the several requests a command makes.
+# The urllib3 pool is thread-safe.
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4, pool_maxsize=16,
+    max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504])))
+_SESSION.headers.update({
+    'Accept': 'application/json',
+    'User-Agent': 'Limnoria Polymarket plugin',
+})
+if brotli is not None:
+    _SESSION.headers['Accept-Encoding'] = 'br, gzip'
+_SESSION.verify = False
+# (connect, read) timeouts in seconds
+_TIMEOUT = (3.05, 7)
+
+# How long a fetched 24h-ago price is reused, and how many are kept
+_PRICE_HISTORY_TTL = 300
+_PRICE_HISTORY_MAX = 256
+
+# The first point's price in a prices-history body. Only history[0] is used,
+# so this avoids decoding the whole (often long) series.
+_FIRST_HISTORY_PRICE = re.compile(
+    rb'"history"\s*:\s*\[\s*\{[^}]*?"p"\s*:\s*(-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)')
+
+# How many response bodies _fetch keeps around for conditional requests,
+# and how many bytes of them in total; a body bigger than the byte budget
+# isn't kept at all
+_HTTP_CACHE_MAX = 256
+_HTTP_CACHE_BYTES = 8 * 1024 * 1024
+
+# After every shortening provider has failed, skip shortening for this long
+# instead of paying three timeouts on each reply
+_SHORTEN_COOLDOWN = 60
+# Replies up to this many characters keep the full market URL unshortened
+_SHORTEN_ABOVE = 400
+# (name for logs, pyshorteners attribute), in order of preference
+_SHORTEN_PROVIDERS = (('TinyURL', 'tinyurl'), ('is.gd', 'isgd'), ('da.gd', 'dagd'))
+# Short links are stable, so remember this many per market URL
+_SHORT_CACHE_MAX = 128
+
+def _is_open(market):
+    """True for a market that is active and not closed (missing flags count as open)."""
+    return market.get('active', True) and not market.get('closed', False)
+
 class Polymarket(callbacks.Plugin):
     """Fetches and displays odds from Polymarket"""
 
+    def __init__(self, irc):
+        super().__init__(irc)
+        # clob token id -> (time.monotonic() when fetched, price 24h ago).
+        # Filled from the price-change worker threads, hence the lock.
+        self._price_history_cache = {}
+        self._price_history_lock = threading.Lock()
+        # URL -> (ETag, Last-Modified, body) for conditional requests in _fetch,
+        # and the total size of the bodies held
+        self._http_cache = {}
+        self._http_cache_bytes = 0
+        self._http_cache_lock = threading.Lock()
+        # One shortener for every reply; building it walks pyshorteners' providers
+        try:
+            try:
+                # Some pyshorteners versions accept timeout; others don't.
+                self._shortener = pyshorteners.Shortener(timeout=5)
+            except TypeError:
+                self._shortener = pyshorteners.Shortener()
+        except Exception as e:
+            log.debug("Polymarket: URL shortener setup failed -> %r", e)
+            self._shortener = None
+        # time.monotonic() until which shortening is skipped
+        self._short_fail_until = 0.0
+        # market URL -> short URL
+        self._short_cache = {}
+
     def _as_list(self, value):
         """Ensure API fields that may be stringified JSON arrays are parsed as lists."""
         if isinstance(value, list):
             return value
         if isinstance(value, str):
             try:
-                parsed = json.loads(value)
+                parsed = _loads(value)
                 if isinstance(parsed, list):
                     return parsed
             except Exception:
                 return []
         return []
 
+    @staticmethod
+    def _to_floats(seq):
+        """Convert a list of prices to floats, or return None if any isn't numeric.
+
+        Prices line up with outcomes by index, so one bad entry invalidates the
+        whole list rather than being dropped. Values already decoded as floats
+        are kept as they are.
+        """
+        out = []
+        append = out.append
+        for p in seq:
+            try:
+                append(p if type(p) is float else float(p))
+            except (TypeError, ValueError):
+                return None
+        return out
+
+    def _market_list(self, market: dict, key: str) -> list:
+        """`_as_list` for market[key], storing the parsed list back into the market.
+
+        The same fields are read several times per market; after the first
+        call they take the list fast path instead of being parsed again.
+        """
+        value = market.get(key)
+        if isinstance(value, list):
+            return value
+        if not value:
+            return []
+        parsed = self._as_list(value)
+        market[key] = parsed
+        return parsed
+
+    def _fetch(self, url: str, conditional: bool = True) -> bytes:
+        """GET `url` through the shared session and return the response body.
+
+        Responses that carried an ETag or Last-Modified are remembered, and the
+        next request for the same URL sends them back as If-None-Match /
+        If-Modified-Since, so an unchanged resource comes back as an empty 304
+        answered from the stored body. Pass conditional=False for URLs whose
+        result is already cached elsewhere. Raises requests.HTTPError on error
+        statuses.
+        """
+        if not conditional:
+            response = _SESSION.get(url, timeout=_TIMEOUT)
+            response.raise_for_status()
+            return response.content
+        with self._http_cache_lock:
+            cached = self._http_cache.get(url)
+        headers = {}
+        if cached:
+            etag, last_modified, _ = cached
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+        response = _SESSION.get(url, headers=headers, timeout=_TIMEOUT)
+        if cached and response.status_code == 304:
+            return cached[2]
+        response.raise_for_status()
+        body = response.content
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if (etag or last_modified) and len(body) <= _HTTP_CACHE_BYTES:
+            with self._http_cache_lock:
+                cache = self._http_cache
+                old = cache.pop(url, None)
+                if old:
+                    self._http_cache_bytes -= len(old[2])
+                cache[url] = (etag, last_modified, body)
+                self._http_cache_bytes += len(body)
+                while len(cache) > _HTTP_CACHE_MAX or self._http_cache_bytes > _HTTP_CACHE_BYTES:
+                    # Oldest entry first (insertion order)
+                    self._http_cache_bytes -= len(cache.pop(next(iter(cache)))[2])
+        return body
+
     def _market_label(self, market: dict, outcomes: list) -> str:
         """Derive a readable label for a market when groupItemTitle is missing/empty."""
         label = market.get('groupItemTitle')
@@ -92,29 +259,26 @@ class Polymarket(callbacks.Plugin):
                 f"{encoded_slug}&optimized=true&limit_per_type=1&type=events&search_tags=true&search_profiles=true&cache=true"
             )
         
-        log.debug(f"Polymarket: Fetching data from API URL: {api_url}")
+        log.debug("Polymarket: Fetching data from API URL: %s", api_url)
         
         # Fetch data from API
-        response = requests.get(api_url, verify=False)
-        response.raise_for_status()
-        data = response.json()
+        data = _loads(self._fetch(api_url))
 
         # Fallback to non-optimized endpoint if optimized yields no events
         if (not data or 'events' not in data or not data['events']) and not is_url:
             fallback_url = f"https://gamma-api.polymarket.com/public-search?q={encoded_slug}"
-            log.debug(f"Polymarket: Optimized search empty, falling back to: {fallback_url}")
-            response = requests.get(fallback_url, verify=False)
-            response.raise_for_status()
-            data = response.json()
+            log.debug("Polymarket: Optimized search empty, falling back to: %s", fallback_url)
+            data = _loads(self._fetch(fallback_url))
 
-        log.debug(f"Polymarket: API response data: {data}")  # Log the raw API response
+        log.debug("Polymarket: API response data: %s", data)  # Log the raw API response
 
         if not data or 'events' not in data or not data['events']:
             return {'title': "No matching event found", 'data': [], 'slug': ''}
 
         # Find matching event
         if is_url:
-            matching_event = next((event for event in data['events'] if event['slug'] == slug.replace(' ', '-')), None)
+            target_slug = slug.replace(' ', '-')
+            matching_event = next((event for event in data['events'] if event['slug'] == target_slug), None)
         else:
             # Prefer the first event that has at least one active and unclosed market.
             # If none, fall back to the top event from the API response.
@@ -124,10 +288,7 @@ class Polymarket(callbacks.Plugin):
                     e
                     for e in events
                     # Use builtins.any to avoid shadowing by supybot.commands.any
-                    if builtins.any(
-                        m.get('active', True) and not m.get('closed', False)
-                        for m in e.get('markets', [])
-                    )
+                    if builtins.any(map(_is_open, e.get('markets', [])))
                 ),
                 (events[0] if events else None),
             )
@@ -140,7 +301,7 @@ class Polymarket(callbacks.Plugin):
         markets = matching_event.get('markets', [])
 
         # Filter out inactive or closed markets (e.g., placeholders without real pricing)
-        filtered_markets = [m for m in markets if m.get('active', True) and not m.get('closed', False)]
+        filtered_markets = list(filter(_is_open, markets))
 
         # Fallback: if no active and unclosed markets, use the top market from the API response
         if filtered_markets:
@@ -152,25 +313,21 @@ class Polymarket(callbacks.Plugin):
         # If optimized search omitted clobTokenIds, try to enrich from detailed endpoints
         markets = self._ensure_clob_ids(slug, markets)
 
-        log.debug(f"Polymarket: Matching event found: {title}, slug: {slug}, markets: {markets}")  # Log matching event details
+        log.debug("Polymarket: Matching event found: %s, slug: %s, markets: %s", title, slug, markets)  # Log matching event details
 
         # Parse market data
         cleaned_data = []
         for market in markets:
             # Normalize fields that sometimes arrive as stringified JSON
-            outcomes = self._as_list(market.get('outcomes', []))
-            outcome_prices_raw = self._as_list(market.get('outcomePrices', []))
+            outcomes = self._market_list(market, 'outcomes')
+            outcome_prices_raw = self._market_list(market, 'outcomePrices')
             # Convert prices to floats if present
-            outcome_prices = []
-            try:
-                outcome_prices = [float(p) for p in outcome_prices_raw]
-            except Exception:
-                outcome_prices = []
+            outcome_prices = self._to_floats(outcome_prices_raw) or []
 
-            clob_token_ids = self._as_list(market.get('clobTokenIds', []))
+            clob_token_ids = self._market_list(market, 'clobTokenIds')
             outcome = self._market_label(market, outcomes)
 
-            log.debug(f"Polymarket: Parsing market: {outcome}")  # Log the current market being parsed
+            log.debug("Polymarket: Parsing market: %s", outcome)  # Log the current market being parsed
             try:
                 # Handle empty outcomePrices for Yes/No markets
                 if not outcome_prices:
@@ -189,15 +346,15 @@ class Polymarket(callbacks.Plugin):
                             no_price = 1 - yes_price
                             outcome_prices = [yes_price, no_price]
                         else:
-                            log.debug(f"Skipping market due to missing prices: {market}")
+                            log.debug("Skipping market due to missing prices: %s", market)
                             continue
                     else:
-                        log.debug(f"Skipping non-Yes/No market with missing outcomePrices: {market}")
+                        log.debug("Skipping non-Yes/No market with missing outcomePrices: %s", market)
                         continue
                 if len(outcome_prices) != len(outcomes):
-                    log.debug(f"Skipping market due to mismatched outcomePrices: {market}")
+                    log.debug("Skipping market due to mismatched outcomePrices: %s", market)
                     continue
-                log.debug(f"Polymarket: Outcomes: {outcomes}, Prices: {outcome_prices}, Token IDs: {clob_token_ids}")  # Log parsed data
+                log.debug("Polymarket: Outcomes: %s, Prices: %s, Token IDs: %s", outcomes, outcome_prices, clob_token_ids)  # Log parsed data
                 if len(outcomes) == 2 and 'Yes' in outcomes and 'No' in outcomes:
                     yes_index = outcomes.index('Yes')
                     no_index = outcomes.index('No')
@@ -215,13 +372,13 @@ class Polymarket(callbacks.Plugin):
                         cleaned_data.append((outcome, probability, display_outcome, clob_id))
                 else:
                     # For multi-outcome markets, always use the highest probability
-                    max_price_index = outcome_prices.index(max(outcome_prices, key=float))
-                    probability = float(outcome_prices[max_price_index])
+                    max_price_index = max(range(len(outcome_prices)), key=outcome_prices.__getitem__)
+                    probability = outcome_prices[max_price_index]
                     display_outcome = outcomes[max_price_index]
                     clob_id = clob_token_ids[max_price_index] if max_price_index < len(clob_token_ids) else None
                     cleaned_data.append((outcome, probability, display_outcome, clob_id))
             except (KeyError, ValueError, TypeError, IndexError, json.JSONDecodeError) as e:
-                log.error(f"Polymarket: Error parsing market data: {str(e)}")  # Log parsing errors
+                log.error("Polymarket: Error parsing market data: %s", e)  # Log parsing errors
                 continue
 
         # Sort outcomes by probability and limit to max_responses
@@ -233,29 +390,33 @@ class Polymarket(callbacks.Plugin):
             'data': [item for item in cleaned_data if item[1] >= 0.01 or len(cleaned_data) == 1][:max_responses]
         }
         
-        log.debug(f"Polymarket: Parsed event data: {result}")
+        log.debug("Polymarket: Parsed event data: %s", result)
         
         return result
 
     def _ensure_clob_ids(self, event_slug: str, markets: list) -> list:
         """Ensure markets include clobTokenIds by fetching enriched data when available.
 
-        Tries event-by-slug endpoint first, then per-market by slug.
+        Tries event-by-slug endpoint first, then one market-endpoint lookup for
+        every market still missing them.
         Swallows errors and returns markets unchanged on failure.
         """
         try:
             # Quick check: if at least one market already has clobTokenIds, we still try to fill the rest.
-            need_fill = [m for m in markets if not self._as_list(m.get('clobTokenIds', []))]
+            need_fill = [m for m in markets if not self._market_list(m, 'clobTokenIds')]
             if not need_fill:
                 return markets
 
             # Attempt: fetch event details by slug
             if event_slug:
                 evt_url = f"https://gamma-api.polymarket.com/events?slug={quote(event_slug)}"
-                log.debug(f"Polymarket: Enriching markets via event endpoint: {evt_url}")
-                r = requests.get(evt_url, verify=False)
-                if r.ok:
-                    evt = r.json()
+                log.debug("Polymarket: Enriching markets via event endpoint: %s", evt_url)
+                try:
+                    evt_body = self._fetch(evt_url)
+                except requests.HTTPError:
+                    evt_body = None
+                if evt_body is not None:
+                    evt = _loads(evt_body)
                     # Response might be {"events": [...]} or a single event dict
                     evt_obj = None
                     if isinstance(evt, dict) and 'events' in evt and evt['events']:
@@ -265,130 +426,157 @@ class Polymarket(callbacks.Plugin):
                     if evt_obj and 'markets' in evt_obj:
                         by_slug = {em.get('slug'): em for em in evt_obj['markets']}
                         for m in markets:
-                            if not self._as_list(m.get('clobTokenIds', [])):
+                            if not self._market_list(m, 'clobTokenIds'):
                                 em = by_slug.get(m.get('slug'))
-                                if em and self._as_list(em.get('clobTokenIds', [])):
+                                if em and self._market_list(em, 'clobTokenIds'):
                                     m['clobTokenIds'] = em.get('clobTokenIds')
 
-            # Per-market enrichment for any still missing
-            for m in markets:
-                if self._as_list(m.get('clobTokenIds', [])):
-                    continue
-                mslug = m.get('slug')
-                if not mslug:
-                    continue
-                m_url = f"https://gamma-api.polymarket.com/markets?slug={quote(mslug)}"
-                log.debug(f"Polymarket: Enriching market via market endpoint: {m_url}")
-                try:
-                    rr = requests.get(m_url, verify=False)
-                    if not rr.ok:
-                        continue
-                    mj = rr.json()
-                    candidate = None
-                    if isinstance(mj, dict) and 'markets' in mj and mj['markets']:
-                        candidate = mj['markets'][0]
-                    elif isinstance(mj, list) and mj:
-                        candidate = mj[0]
-                    elif isinstance(mj, dict) and 'clobTokenIds' in mj:
-                        candidate = mj
-                    if candidate and self._as_list(candidate.get('clobTokenIds', [])):
+            # Market-endpoint enrichment for any still missing: one request
+            # with a slug param per market, then per-market requests for the
+            # slugs that request didn't come back with
+            missing = [m for m in markets
+                       if m.get('slug') and not self._market_list(m, 'clobTokenIds')]
+            if missing:
+                slugs = [m['slug'] for m in missing]
+                m_url = "https://gamma-api.polymarket.com/markets?" + "&".join(
+                    f"slug={quote(mslug)}" for mslug in slugs)
+                log.debug("Polymarket: Enriching markets via market endpoint: %s", m_url)
+                candidates = self._fetch_markets(m_url)
+                by_slug = {c.get('slug'): c for c in candidates if isinstance(c, dict)}
+                unmatched = [mslug for mslug in slugs if mslug not in by_slug]
+                if unmatched and len(slugs) > 1:
+                    with ThreadPoolExecutor(max_workers=4) as executor:
+                        found_lists = executor.map(
+                            lambda mslug: self._fetch_markets(
+                                f"https://gamma-api.polymarket.com/markets?slug={quote(mslug)}"),
+                            unmatched)
+                        for mslug, found in zip(unmatched, found_lists):
+                            # One slug per request, so its first result is the match
+                            if found and isinstance(found[0], dict):
+                                by_slug[mslug] = found[0]
+                for m in missing:
+                    candidate = by_slug.get(m['slug'])
+                    if candidate is None and len(missing) == 1 and len(candidates) == 1:
+                        # Lone lookup: trust the match even if the slug wasn't echoed
+                        candidate = candidates[0]
+                    if candidate and self._market_list(candidate, 'clobTokenIds'):
                         m['clobTokenIds'] = candidate.get('clobTokenIds')
-                except Exception:
-                    continue
         except Exception as e:
-            log.debug(f"Polymarket: _ensure_clob_ids failed: {e}")
+            log.debug("Polymarket: _ensure_clob_ids failed: %s", e)
         return markets
 
-    def _shorten_url(self, market_url: str) -> str:
-        """Attempts to shorten a URL with multiple providers and broad compatibility.
+    def _fetch_markets(self, m_url: str) -> list:
+        """Fetch a gamma markets query and return the markets it found.
 
-        Tries TinyURL first (Polymarket links are long), then falls back to
-        is.gd and da.gd. Returns the original URL on any failure.
+        The endpoint may answer with a list, a {"markets": [...]} wrapper or a
+        single market dict. Returns an empty list on any failure.
         """
         try:
-            try:
-                # Some pyshorteners versions accept timeout; others don't.
-                shortener = pyshorteners.Shortener(timeout=5)
-            except TypeError:
-                shortener = pyshorteners.Shortener()
-
-            # Preferred provider: TinyURL
-            try:
-                short_url = shortener.tinyurl.short(market_url)
-                log.debug(f"Polymarket: URL shortened via TinyURL -> {short_url}")
-                return short_url
-            except Exception as e:
-                log.debug(f"Polymarket: TinyURL failed -> {e!r}")
+            mj = _loads(self._fetch(m_url))
+        except Exception as e:
+            log.debug("Polymarket: market lookup failed for %s: %s", m_url, e)
+            return []
+        if isinstance(mj, dict) and 'markets' in mj and mj['markets']:
+            return mj['markets']
+        if isinstance(mj, list):
+            return mj
+        if isinstance(mj, dict) and 'clobTokenIds' in mj:
+            return [mj]
+        return []
 
-            # Fallback: is.gd
-            try:
-                short_url = shortener.isgd.short(market_url)
-                log.debug(f"Polymarket: URL shortened via is.gd -> {short_url}")
-                return short_url
-            except Exception as e:
-                log.debug(f"Polymarket: is.gd failed -> {e!r}")
+    def _shorten_url(self, market_url: str) -> str:
+        """Attempts to shorten a URL with multiple providers and broad compatibility.
 
-            # Fallback: da.gd
+        Tries TinyURL first (Polymarket links are long), then falls back to
+        is.gd and da.gd. Returns the original URL on any failure, and keeps
+        returning it for _SHORTEN_COOLDOWN seconds once every provider has failed.
+        """
+        short_url = self._short_cache.get(market_url)
+        if short_url:
+            return short_url
+        shortener = self._shortener
+        if shortener is None or time.monotonic() < self._short_fail_until:
+            return market_url
+        # Preferred provider: TinyURL, then is.gd and da.gd as fallbacks
+        for name, provider in _SHORTEN_PROVIDERS:
             try:
-                short_url = shortener.dagd.short(market_url)
-                log.debug(f"Polymarket: URL shortened via da.gd -> {short_url}")
-                return short_url
+                short_url = getattr(shortener, provider).short(market_url)
             except Exception as e:
-                log.debug(f"Polymarket: da.gd failed -> {e!r}")
-        except Exception as e:
-            log.debug(f"Polymarket: URL shortener setup failed -> {e!r}")
+                log.debug("Polymarket: %s failed -> %r", name, e)
+                continue
+            log.debug("Polymarket: URL shortened via %s -> %s", name, short_url)
+            self._short_cache[market_url] = short_url
+            if len(self._short_cache) > _SHORT_CACHE_MAX:
+                # Oldest entry first (insertion order)
+                self._short_cache.pop(next(iter(self._short_cache)), None)
+            return short_url
+        self._short_fail_until = time.monotonic() + _SHORTEN_COOLDOWN
         return market_url
 
     def _get_price_change(self, clob_token_id, current_price):
         """Fetches and calculates the 24-hour price change for a given clob_token_id."""
         if not clob_token_id:
             return None
+        with self._price_history_lock:
+            cached = self._price_history_cache.get(clob_token_id)
+        if cached and time.monotonic() - cached[0] < _PRICE_HISTORY_TTL:
+            return current_price - cached[1]
         api_url = f"https://clob.polymarket.com/prices-history?interval=1d&market={clob_token_id}&fidelity=1"
         try:
-            response = requests.get(api_url, verify=False)
-            response.raise_for_status()
-            data = response.json()
-            if data and 'history' in data and len(data['history']) > 0:
+            # _price_history_cache already holds the one number used from this
+            body = self._fetch(api_url, conditional=False)
+            match = _FIRST_HISTORY_PRICE.search(body)
+            if match:
+                price_24h_ago = float(match.group(1))
+            else:
+                data = _loads(body)
+                if not (data and 'history' in data and len(data['history']) > 0):
+                    return None
                 price_24h_ago = data['history'][0]['p']
-                return current_price - price_24h_ago
+            with self._price_history_lock:
+                cache = self._price_history_cache
+                cache.pop(clob_token_id, None)
+                cache[clob_token_id] = (time.monotonic(), price_24h_ago)
+                if len(cache) > _PRICE_HISTORY_MAX:
+                    # Oldest entry first (insertion order)
+                    cache.pop(next(iter(cache)))
+            return current_price - price_24h_ago
         except Exception as e:
-            log.error(f"Error fetching price history: {str(e)}")
+            log.error("Error fetching price history: %s", e)
         return None
 
     def _find_matching_event(self, events: list, slug: str, is_url: bool) -> dict:
         """Finds the matching event from a list of events."""
         if is_url:
-            return next((event for event in events if event['slug'] == slug.replace(' ', '-')), None)
+            target_slug = slug.replace(' ', '-')
+            return next((event for event in events if event['slug'] == target_slug), None)
         else:
             return events[0] if events else None
 
     def _parse_market_data(self, market: dict) -> list:
         """Parses data for a single market within an event."""
         # Skip inactive or closed markets
-        if not market.get('active', True) or market.get('closed', False):
+        if not _is_open(market):
             log.debug(
                 "Polymarket: Skipping inactive/closed market: %s",
                 market.get('groupItemTitle', market.get('slug', 'unknown')),
             )
             return []
-        outcomes = self._as_list(market.get('outcomes', []))
-        outcome_prices_raw = self._as_list(market.get('outcomePrices', []))
-        try:
-            outcome_prices = [float(p) for p in outcome_prices_raw]
-        except Exception:
-            outcome_prices = []
-        clob_token_ids = self._as_list(market.get('clobTokenIds', []))
+        outcomes = self._market_list(market, 'outcomes')
+        outcome_prices_raw = self._market_list(market, 'outcomePrices')
+        outcome_prices = self._to_floats(outcome_prices_raw) or []
+        clob_token_ids = self._market_list(market, 'clobTokenIds')
         outcome = self._market_label(market, outcomes)
-        log.debug(f"Polymarket: Parsing market: {outcome}")
+        log.debug("Polymarket: Parsing market: %s", outcome)
         try:
-            log.debug(f"Polymarket: Outcomes: {outcomes}, Prices: {outcome_prices}, Token IDs: {clob_token_ids}")
+            log.debug("Polymarket: Outcomes: %s, Prices: %s, Token IDs: %s", outcomes, outcome_prices, clob_token_ids)
 
             if len(outcomes) == 2 and 'Yes' in outcomes and 'No' in outcomes:
                 return self._parse_yes_no_market(outcomes, outcome_prices, clob_token_ids)
             else:
                 return self._parse_multi_outcome_market(outcomes, outcome_prices, clob_token_ids)
         except (KeyError, ValueError, json.JSONDecodeError) as e:
-            log.error(f"Polymarket: Error parsing market  {str(e)}")
+            log.error("Polymarket: Error parsing market  %s", e)
             return []
 
     def _parse_yes_no_market(self, outcomes: list, outcome_prices: list, clob_token_ids: list) -> list:
@@ -406,8 +594,8 @@ class Polymarket(callbacks.Plugin):
 
     def _parse_multi_outcome_market(self, outcomes: list, outcome_prices: list, clob_token_ids: list) -> list:
         """Parses data for a multi-outcome market."""
-        max_price_index = outcome_prices.index(max(outcome_prices, key=float))
-        probability = float(outcome_prices[max_price_index])
+        max_price_index = max(range(len(outcome_prices)), key=outcome_prices.__getitem__)
+        probability = outcome_prices[max_price_index]
         display_outcome = outcomes[max_price_index]
         return [(outcomes[max_price_index], probability, display_outcome, clob_token_ids[max_price_index])]
 
@@ -422,30 +610,37 @@ class Polymarket(callbacks.Plugin):
             is_url = query.startswith('http://') or query.startswith('https://')
             result = self._parse_polymarket_event(query, is_url=is_url)
             log.debug(
-                f"Polymarket: result summary -> title={result.get('title')}, slug={result.get('slug')}, count={len(result.get('data', []))}"
+                "Polymarket: result summary -> title=%s, slug=%s, count=%s",
+                result.get('title'), result.get('slug'), len(result.get('data', [])),
             )
             if result['data']:
                 filtered_data = result['data'][:20]
-                log.debug(f"Polymarket: formatting {len(filtered_data)} items")
+                log.debug("Polymarket: formatting %s items", len(filtered_data))
                 
+                # Each 24h change is its own request; fetch them concurrently
+                with ThreadPoolExecutor(max_workers=8) as executor:
+                    price_changes = list(executor.map(
+                        lambda item: self._get_price_change(item[3], item[1]) if item[3] else None,
+                        filtered_data))
+
                 # Format output
-                output = f"\x02{result['title']}\x02: "
-                for item in filtered_data:
+                parts = [f"\x02{result['title']}\x02: "]
+                for item, price_change in zip(filtered_data, price_changes):
                     try:
                         outcome, probability, display_outcome, clob_token_id = item
-                        log.debug(f"Polymarket: item -> outcome={outcome}, prob={probability}, clob={clob_token_id}")
-                        price_change = self._get_price_change(clob_token_id, probability) if clob_token_id else None
+                        log.debug("Polymarket: item -> outcome=%s, prob=%s, clob=%s", outcome, probability, clob_token_id)
                         change_str = (
                             f" ({'⬆️' if price_change > 0 else '🔻'}{abs(price_change)*100:.1f}%)"
                             if price_change is not None and price_change != 0
                             else ""
                         )
-                        output += f"{outcome}: \x02{probability:.0%}{change_str}{' (' + display_outcome + ')' if display_outcome != 'Yes' else ''}\x02 | "
+                        suffix = f" ({display_outcome})" if display_outcome != 'Yes' else ""
+                        parts.append(f"{outcome}: \x02{probability:.0%}{change_str}{suffix}\x02 | ")
                     except Exception as e:
-                        log.exception(f"Polymarket: formatting error for item {item!r}: {e!r}")
+                        log.exception("Polymarket: formatting error for item %r: %r", item, e)
                         continue
                 
-                output = output.rstrip(' | ')
+                output = "".join(parts).rstrip(' | ')
                 
                 # Generate URL
                 if is_url:
@@ -453,15 +648,20 @@ class Polymarket(callbacks.Plugin):
                 else:
                     slug = result.get('slug', '')
                     market_url = f"https://polymarket.com/event/{slug}" if slug else "https://polymarket.com"
-                log.debug(f"Polymarket: market_url={market_url}")
+                log.debug("Polymarket: market_url=%s", market_url)
                 
-                # Try to shorten URL (TinyURL with fallbacks); append full URL if it fails
-                short_url = self._shorten_url(market_url)
-                if short_url == market_url:
-                    log.warning("Polymarket: URL shortening unavailable; using full URL.")
+                # Only shorten when the full URL would push the reply past
+                # _SHORTEN_ABOVE; otherwise skip the shortener's round trip
+                if len(output) + len(market_url) + 3 <= _SHORTEN_ABOVE:
+                    short_url = market_url
+                else:
+                    # Try to shorten URL (TinyURL with fallbacks); append full URL if it fails
+                    short_url = self._shorten_url(market_url)
+                    if short_url == market_url:
+                        log.warning("Polymarket: URL shortening unavailable; using full URL.")
                 output += f" | {short_url}"
                 
-                log.debug(f"Polymarket: Sending IRC reply: {output}")
+                log.debug("Polymarket: Sending IRC reply: %s", output)
                 
                 irc.reply(output, prefixNick=False)
             else:
@@ -472,7 +672,7 @@ class Polymarket(callbacks.Plugin):
             irc.reply("Error parsing data from Polymarket. The API response may be invalid.")
         except Exception as e:
             # Include full stack trace to aid debugging in production logs
-            log.exception(f"Polymarket plugin error: {e!r}")
+            log.exception("Polymarket plugin error: %r", e)
             irc.reply("An unexpected error occurred. Please try again later.")
 
     polymarket = wrap(polymarket, ['text'])
@@ -484,18 +684,33 @@ class Polymarket(callbacks.Plugin):
         Each market name should have words separated by hyphens.
         """
 
-        log.debug("msg", msg, "text", text)
+        log.debug("Polymarket: polymarkets msg=%s text=%s", msg, text)
         queries = text.split()  # Split by spaces instead of using shlex
 
-        log.debug(f"Split queries: {queries}")
+        log.debug("Split queries: %s", queries)
+
+        def lookup(query):
+            is_url = query.startswith('http://') or query.startswith('https://')
+            return self._parse_polymarket_event(
+                query.replace('-', ' ') if not is_url else query, is_url=is_url)
+
+        # Look each distinct query up once, all at the same time; the results
+        # are then walked in the order given so the title filtering below
+        # sees them exactly as before
+        unique = list(dict.fromkeys(queries))
+        if not unique:
+            irc.reply("No matching markets found for the provided queries.")
+            return
+        with ThreadPoolExecutor(max_workers=min(8, len(unique))) as executor:
+            results_by_query = dict(zip(unique, executor.map(lookup, unique)))
 
         combined_results = []
         seen_words = set()  # Track words from previous market titles
         for query in queries:
+            result = results_by_query[query]
             is_url = query.startswith('http://') or query.startswith('https://')
             query = query.replace('-', ' ') if not is_url else query
-            result = self._parse_polymarket_event(query, is_url=is_url)
-            log.debug(f"Processing query: {query}")
+            log.debug("Processing query: %s", query)
             if result['data']:
                 market_title = result['title']  # Get the title from the result
                 
@@ -6,13 +6,82 @@ import supybot.callbacks as callbacks
 import supybot.ircmsgs as ircmsgs
 import supybot.conf as conf
 import supybot.world as world
+import ast
 import time
 import re
-from urllib.parse import urlparse, urlunsplit, parse_qs, urlencode
+import functools
+import json
+import sqlite3
+import threading
+from bisect import bisect_left, insort
+from collections import deque
+from urllib.parse import parse_qs, parse_qsl, urlencode
 from supybot import registry
 # import pprint  # For pretty printing in debug logs
 import supybot.ircdb as ircdb
 
+# Tables behind the in-memory dicts; every change is written through as a
+# single-row statement
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS counts (nick TEXT PRIMARY KEY, n INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS links (url TEXT PRIMARY KEY, poster TEXT NOT NULL, ts REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS aliases (alias TEXT PRIMARY KEY, target TEXT NOT NULL);
+"""
+
+# First URL in a message, split into netloc, path and query in the same
+# scan so it never has to go through urlparse. Taken together this matches
+# the common (?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\(\),]|%XX)+ URL pattern folded
+# into one character class, [!$-_a-z] (the '$'..'_' range already covers
+# digits, upper case, '%' and the other punctuation); the netloc class leaves
+# out '/' and '?', and the path class leaves out '?'.
+_URL_RE = re.compile(
+    r'https?://(?=[!$-_a-z])'
+    r'([!$-.0->@-_a-z]*)'      # netloc
+    r'([!$->@-_a-z]*)'         # path
+    r'(?:\?([!$-_a-z]*))?')    # query
+
+# Tracking parameters that never change what a link points to; they're
+# dropped from every URL so the same link shared from different places matches.
+# A bare 'ref' isn't one of them: sites like GitHub use it to pick a branch.
+_BAD_PARAMS = frozenset((
+    'utm_source', 'utm_medium', 'utm_campaign', 'utm_content', 'utm_term',
+    'fbclid', 'gclid', 'mc_cid', 'mc_eid', 'mdrv', 'chash', '_ga',
+    'ref_src', 'mtm_campaign', 'mtm_kwd', 'mtm_cid',
+))
+
+@functools.lru_cache(maxsize=4096)
+def _canonical_url(netloc, path, query, domains_ignore_params):
+    """Lowercase a URL onto http://, dropping the query for the given domains.
+
+    Elsewhere tracking parameters are dropped and the rest sorted, so the
+    same link matches whatever order its parameters came in. Cached because
+    the point of the plugin is seeing the same URLs again;
+    domains_ignore_params must be hashable (a frozenset).
+    """
+    domain = netloc.lower()
+    base_domain = domain[4:] if domain.startswith('www.') else domain
+    path = path.lower()
+    if ';' in path:
+        # ;params on the last path segment aren't part of the link
+        cut = path.find(';', path.rfind('/'))
+        if cut != -1:
+            path = path[:cut]
+
+    if base_domain in domains_ignore_params or not query:
+        # For specified domains, remove all parameters
+        return f'http://{domain}{path}'
+    # For other domains, keep all parameters except the tracking ones
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(query.lower(), keep_blank_values=True)
+        if k not in _BAD_PARAMS))
+    return f'http://{domain}{path}?{query}' if query else f'http://{domain}{path}'
+
+# Links older than this (in seconds) are forgotten
+_LINK_TTL = 12 * 3600
+
+# The lowercased-nick cache is emptied once it holds this many nicks
+_LOWER_CACHE_MAX = 4096
+
 class RepostCount(callbacks.Plugin):
     """
     A plugin to track and count reposts of links in a specified channel.
@@ -21,32 +90,128 @@ class RepostCount(callbacks.Plugin):
     def __init__(self, irc):
         self.__parent = super(RepostCount, self)
         self.__parent.__init__(irc)
-        self.filename = conf.supybot.directories.data.dirize(self.name() + '.db')
-        self.link_filename = conf.supybot.directories.data.dirize(self.name() + '_links.db')
-        self.alias_filename = conf.supybot.directories.data.dirize(self.name() + '_aliases.db')
-        # Loads existing repost counts, link database, and alias map
-        self.user_repost_count, self.link_database, self.alias_map = self.load_data()
-        self.domains_ignore_params = ['twitter.com', 'x.com', 'twimg.com', 'nytimes.com']
-
-    def load_data(self):
-        """Load the user repost count, link database, and alias map from files."""
+        self.filename = conf.supybot.directories.data.dirize(self.name() + '.sqlite3')
+        # doPrivmsg runs on the main thread but commands may not (threaded
+        # plugins, supybot.debug.threadAllCommands), so the connection is
+        # shared across threads and everything touching it or the dicts
+        # below holds this lock
+        self._lock = threading.RLock()
+        self.domains_ignore_params = frozenset(['twitter.com', 'x.com', 'twimg.com', 'nytimes.com'])
+        self._db = self._open_db()
+        # Loads existing repost counts, link database, and alias map. The link
+        # database is kept as two parallel dicts keyed by URL: who posted it
+        # and when.
+        (self.user_repost_count, self._link_poster, self._link_time,
+         self.alias_map) = self.load_data()
+        # target -> nicks whose alias_map entry points straight at it, so the
+        # nicks hanging off an alias can be found without scanning the map
+        self._alias_children = {}
+        for alias, target in self.alias_map.items():
+            self._alias_children.setdefault(target, set()).add(alias)
+        # Nicks whose alias_map entry _canonical_nick rewrote (or dropped)
+        # since the last commit; lookups don't write, so these go to the
+        # aliases table with the next change that does
+        self._alias_dirty = set()
+        # nick -> nick.lower() for _canonical_nick; a channel only has so
+        # many nicks, so the same few strings aren't lowercased over and over
+        self._lower_cache = {}
+        # (-count, nick) for every entry in user_repost_count, kept sorted so
+        # the top of the list is the leaderboard and a rank is one bisect
+        self._leaderboard = sorted(
+            (-count, nick) for nick, count in self.user_repost_count.items())
+        # (timestamp, url) for every link recorded, oldest first, so purging
+        # only looks at the links that are actually expiring
+        self._link_order = deque(sorted(
+            (timestamp, url) for url, timestamp in self._link_time.items()))
+        # doPrivmsg sees every message, so keep the channel setting at hand
+        # and only read it again when the config changes
+        self.channel = self.registryValue('channel')
+        self._channel_callback = self._update_channel
+        conf.supybot.plugins.RepostCount.channel.addCallback(self._channel_callback)
+
+    def _open_db(self):
+        """Open the SQLite database, importing the old flat files the first time."""
+        db = sqlite3.connect(self.filename, check_same_thread=False)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=NORMAL')
+        db.executescript(_SCHEMA)
+        version = db.execute('PRAGMA user_version').fetchone()[0]
+        if version < 2:
+            with db:
+                if version == 0:
+                    self._import_files(db)
+                # Version 1 stored link URLs before tracking parameters were
+                # dropped and the query sorted
+                self._recanonicalise_links(db)
+                db.execute('PRAGMA user_version = 2')
+        return db
+
+    def _recanonicalise_links(self, db):
+        """Rewrite the stored link URLs into the form _strip_url_params gives now.
+
+        Where several old URLs fold into one, the most recent post is kept.
+        """
+        links = {}
+        for url, poster, ts in db.execute('SELECT url, poster, ts FROM links ORDER BY ts'):
+            match = _URL_RE.match(url)
+            if match:
+                url = _canonical_url(*match.groups(), self.domains_ignore_params)
+            links[url] = (url, poster, ts)
+        db.execute('DELETE FROM links')
+        db.executemany('INSERT INTO links VALUES (?, ?, ?)', links.values())
+
+    def _import_files(self, db):
+        """Copy data from the flat files older versions used into the database."""
+        data_dir = conf.supybot.directories.data
+        counts = self._read_db(data_dir.dirize(self.name() + '.db'))
+        links = self._read_db(data_dir.dirize(self.name() + '_links.db'))
+        aliases = self._read_db(data_dir.dirize(self.name() + '_aliases.db'))
+        if isinstance(links.get('posters'), dict) and isinstance(links.get('times'), dict):
+            link_rows = [(url, poster, links['times'][url])
+                         for url, poster in links['posters'].items() if url in links['times']]
+        else:
+            # {url: (nick, timestamp)}
+            link_rows = [(url, entry[0], entry[1]) for url, entry in links.items()]
+        db.executemany('INSERT OR REPLACE INTO counts VALUES (?, ?)', counts.items())
+        db.executemany('INSERT OR REPLACE INTO links VALUES (?, ?, ?)', link_rows)
+        db.executemany('INSERT OR REPLACE INTO aliases VALUES (?, ?)', aliases.items())
+        if counts or link_rows or aliases:
+            self.log.info('RepostCount: imported %s counts, %s links and %s aliases '
+                          'from the old data files', len(counts), len(link_rows), len(aliases))
+
+    @staticmethod
+    def _read_db(filename):
+        """Read one old-style data file, returning an empty dict if it's missing or unreadable.
+
+        These are JSON, or repr() dicts from before that, which are read
+        safely via ast.literal_eval.
+        """
         try:
-            with open(self.filename, 'r') as f:
-                user_repost_count = eval(f.read())
-        except Exception:
-            user_repost_count = {}
-
+            with open(filename, 'rb') as f:
+                raw = f.read()
+        except OSError:
+            return {}
         try:
-            with open(self.link_filename, 'r') as f:
-                link_database = eval(f.read())
-        except Exception:
-            link_database = {}
-
+            return json.loads(raw)
+        except ValueError:
+            pass
         try:
-            with open(self.alias_filename, 'r') as f:
-                alias_map = eval(f.read())
+            data = ast.literal_eval(raw.decode('utf-8'))
         except Exception:
-            alias_map = {}
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def load_data(self):
+        """Load the user repost count, link database, and alias map from the database."""
+        db = self._db
+        user_repost_count = dict(db.execute('SELECT nick, n FROM counts'))
+        link_poster = {}
+        link_time = {}
+        for url, poster, ts in db.execute('SELECT url, poster, ts FROM links'):
+            link_poster[url] = poster
+            link_time[url] = ts
+        alias_map = {alias: target for alias, target
+                     in db.execute('SELECT alias, target FROM aliases') if alias != target}
 
         # Normalize keys to lowercase and fold counts through alias map
         def canonical(n, amap):
@@ -69,67 +234,138 @@ class RepostCount(callbacks.Plugin):
             ck = canonical(k, alias_map)
             final_counts[ck] = final_counts.get(ck, 0) + v
 
-        return final_counts, link_database, alias_map
-
-    def save_data(self):
-        """Save the user repost count, link database, and alias map to files."""
-        with open(self.filename, 'w') as f:
-            f.write(repr(self.user_repost_count))
-
-        with open(self.link_filename, 'w') as f:
-            f.write(repr(self.link_database))
+        if final_counts != user_repost_count:
+            with db:
+                db.execute('DELETE FROM counts')
+                db.executemany('INSERT INTO counts VALUES (?, ?)', final_counts.items())
+        # A self-loop left by an older version only clutters the alias list
+        with db:
+            db.execute('DELETE FROM aliases WHERE alias = target')
 
-        with open(self.alias_filename, 'w') as f:
-            f.write(repr(self.alias_map))
+        return final_counts, link_poster, link_time, alias_map
 
     def die(self):
-        """Save data when the plugin is unloaded."""
-        self.save_data()
+        """Close the database when the plugin is unloaded."""
+        conf.supybot.plugins.RepostCount.channel.removeCallback(self._channel_callback)
+        with self._lock:
+            self._db.close()
         self.__parent.die()
 
-    def _strip_url_params(self, url):
-        """Remove query parameters from URLs of specified domains."""
-        parsed = urlparse(url)
-        domain = parsed.netloc.lower()
-        base_domain = domain[4:] if domain[:4] == 'www.' else domain
-        
-        if base_domain in self.domains_ignore_params:
-            # For specified domains, remove all parameters
-            self.log.debug(f"Stripping params from URL: {url}")
-            clean_url = urlunsplit(('http', parsed.netloc.lower(), parsed.path.lower(), '', ''))
-        else:
-            # For other domains, keep all parameters
-            clean_url = urlunsplit(('http', parsed.netloc.lower(), parsed.path.lower(), parsed.query.lower(), ''))
-        
-        self.log.debug(f"Parsed URL: {parsed}, Domain: {domain}, Clean URL: {clean_url}")       
+    def _update_channel(self):
+        """Registry callback: pick up a new channel setting."""
+        self.channel = self.registryValue('channel')
+
+    def _strip_url_params(self, match):
+        """Canonicalise a URL found by _extract_url, removing query parameters as configured."""
+        netloc, path, query = match.groups()
+        clean_url = _canonical_url(netloc, path, query, self.domains_ignore_params)
+        self.log.debug("Clean URL for %s: %s", match.group(0), clean_url)
         return clean_url
 
     def _extract_url(self, text):
-        """Extract the first URL from a given text."""
-        url_pattern = r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
-        match = re.search(url_pattern, text)
-        return match.group(0) if match else None
+        """Find the first URL in a given text, returning its match (or None)."""
+        return _URL_RE.search(text)
+
+    def _record_link(self, url, nick, timestamp):
+        """Store who posted a link and when."""
+        self._link_poster[url] = nick
+        self._link_time[url] = timestamp
+        self._link_order.append((timestamp, url))
+        self._db.execute('INSERT OR REPLACE INTO links VALUES (?, ?, ?)', (url, nick, timestamp))
 
     def _purge_old_links(self):
-        """Remove links older than 12 hours from the database."""
+        """Remove links older than 12 hours from the database.
+
+        Like the other write helpers this leaves committing to the caller.
+        """
         current_time = time.time()
-        old_links = [url for url, (_, timestamp) in self.link_database.items() 
-                     if current_time - timestamp > 12 * 3600]
-        for url in old_links:
-            del self.link_database[url]
-            self.log.debug(f"Removed old link from database: {url}")
+        link_order = self._link_order
+        purged = []
+        while link_order and current_time - link_order[0][0] > _LINK_TTL:
+            timestamp, url = link_order.popleft()
+            # A link posted again since has a newer entry further along;
+            # only the entry matching the stored timestamp expires it
+            if self._link_time.get(url) == timestamp:
+                del self._link_poster[url]
+                del self._link_time[url]
+                purged.append((url,))
+                self.log.debug("Removed old link from database: %s", url)
         
-        if old_links:
-            self.save_data()  # Save after purging
+        if purged:
+            self._db.executemany('DELETE FROM links WHERE url = ?', purged)
 
     def _canonical_nick(self, nick):
-        """Return the canonical (lowercased/aliased) form of a nick."""
-        n = (nick or '').lower()
-        seen = set()
-        while n in self.alias_map and n not in seen:
-            seen.add(n)
-            n = self.alias_map[n]
-        return n
+        """Return the canonical (lowercased/aliased) form of a nick.
+
+        Follows the alias chain with path halving: every visited nick is
+        repointed at its grandparent, so chains flatten as they are used. The
+        rewrites only touch alias_map; _commit writes them out with the next
+        real change. A nick that would end up aliased to itself (a cycle left
+        behind in an old alias file) is dropped instead, which ends the walk.
+        """
+        lower_cache = self._lower_cache
+        n = lower_cache.get(nick)
+        if n is None:
+            n = (nick or '').lower()
+            if len(lower_cache) >= _LOWER_CACHE_MAX:
+                lower_cache.clear()
+            lower_cache[nick] = n
+        amap = self.alias_map
+        while True:
+            parent = amap.get(n)
+            if parent is None:
+                return n
+            grandparent = amap.get(parent, parent)
+            if grandparent == n:
+                self._set_alias(n, None)
+                self._alias_dirty.add(n)
+                return n
+            if grandparent != parent:
+                self._set_alias(n, grandparent)
+                self._alias_dirty.add(n)
+            n = grandparent
+
+    def _set_alias(self, alias, target):
+        """Point alias at target in alias_map, keeping _alias_children in step.
+
+        A target of None removes the alias instead.
+        """
+        children = self._alias_children
+        old = self.alias_map.pop(alias, None)
+        if old is not None:
+            children[old].discard(alias)
+            if not children[old]:
+                del children[old]
+        if target is not None:
+            self.alias_map[alias] = target
+            children.setdefault(target, set()).add(alias)
+
+    def _commit(self):
+        """Write out the alias rewrites made by lookups, then commit."""
+        if self._alias_dirty:
+            amap = self.alias_map
+            for alias in self._alias_dirty:
+                if alias in amap:
+                    self._db.execute('INSERT OR REPLACE INTO aliases VALUES (?, ?)',
+                                     (alias, amap[alias]))
+                else:
+                    self._db.execute('DELETE FROM aliases WHERE alias = ?', (alias,))
+            self._alias_dirty.clear()
+        self._db.commit()
+
+    def _set_count(self, nick, count):
+        """Set a canonical nick's repost count, or remove it if count is None."""
+        board = self._leaderboard
+        old = self.user_repost_count.get(nick)
+        if old is not None:
+            del board[bisect_left(board, (-old, nick))]
+        if count is None:
+            self.user_repost_count.pop(nick, None)
+            self._db.execute('DELETE FROM counts WHERE nick = ?', (nick,))
+        else:
+            self.user_repost_count[nick] = count
+            insort(board, (-count, nick))
+            self._db.execute('INSERT OR REPLACE INTO counts VALUES (?, ?)', (nick, count))
 
     def _merge_alias(self, primary, alias):
         """Alias 'alias' to 'primary' and merge counts into primary."""
@@ -140,28 +376,34 @@ class RepostCount(callbacks.Plugin):
             return False, "Primary and alias resolve to the same nick."
 
         # Update alias mapping
-        self.alias_map[a] = p
+        self._set_alias(a, p)
+        self._db.execute('INSERT OR REPLACE INTO aliases VALUES (?, ?)', (a, p))
 
         # Merge historical counts
         if a in self.user_repost_count:
-            self.user_repost_count[p] = self.user_repost_count.get(p, 0) + self.user_repost_count.get(a, 0)
-            del self.user_repost_count[a]
+            self._set_count(p, self.user_repost_count.get(p, 0) + self.user_repost_count[a])
+            self._set_count(a, None)
 
-        # Also re-fold any existing aliases that might have pointed to 'a'
-        # to now point to 'p' (path compression)
-        for k, v in list(self.alias_map.items()):
-            if v == a:
-                self.alias_map[k] = p
+        # Nicks aliased to 'a' are left pointing at it; _canonical_nick
+        # flattens them onto 'p' the next time they're looked up
 
-        self.save_data()
+        self._commit()
         return True, f"Aliased {alias} -> {primary} and merged counts."
 
     def _remove_alias(self, alias):
         """Remove an alias mapping for a nick (does not split counts)."""
         a = (alias or '').lower()
         if a in self.alias_map:
-            del self.alias_map[a]
-            self.save_data()
+            target = self.alias_map[a]
+            # Nicks that still go through 'a' stay with its primary (unless
+            # that would alias the primary to itself)
+            for k in list(self._alias_children.get(a, ())):
+                self._set_alias(k, target if k != target else None)
+            self._set_alias(a, None)
+            self._db.execute('DELETE FROM aliases WHERE alias = ?', (a,))
+            self._db.execute('UPDATE aliases SET target = ? WHERE target = ?', (target, a))
+            self._db.execute('DELETE FROM aliases WHERE alias = target')
+            self._commit()
             return True, f"Removed alias for {alias}."
         return False, f"No alias found for {alias}."
 
@@ -169,76 +411,82 @@ class RepostCount(callbacks.Plugin):
         """Handle incoming messages and check for reposts."""
         channel = msg.args[0]
         
-        if irc.isChannel(channel) and channel == self.registryValue('channel'):
+        if irc.isChannel(channel) and channel == self.channel:
             text = msg.args[1]
+            # Cheap substring test so most messages never reach the regex engine
+            if 'http' not in text:
+                return
             url = self._extract_url(text)
             
             if url:
-                self._purge_old_links()
-                clean_url = self._strip_url_params(url)
-                nick = msg.nick
-                current_time = time.time()
-
-                if clean_url in self.link_database:
-                    original_poster, post_time = self.link_database[clean_url]
+                with self._lock:
+                    self._purge_old_links()
+                    clean_url = self._strip_url_params(url)
+                    nick = msg.nick
+                    current_time = time.time()
+
+                    post_time = self._link_time.get(clean_url)
+                    if post_time is not None:
+                        original_poster = self._link_poster[clean_url]
+                        cnick = self._canonical_nick(nick)
                     
-                    # Compare canonical nicks to avoid counting case or aliases
-                    if self._canonical_nick(nick) != self._canonical_nick(original_poster):
-                        time_diff = current_time - post_time
-                        hours, remainder = divmod(time_diff, 3600)
-                        minutes, _ = divmod(remainder, 60)
+                        # Compare canonical nicks to avoid counting case or aliases
+                        if cnick != self._canonical_nick(original_poster):
+                            time_diff = current_time - post_time
+                            hours, remainder = divmod(time_diff, 3600)
+                            minutes, _ = divmod(remainder, 60)
                         
-                        cnick = self._canonical_nick(nick)
-                        self.user_repost_count[cnick] = self.user_repost_count.get(cnick, 0) + 1
+                            count = self.user_repost_count.get(cnick, 0) + 1
+                            self._set_count(cnick, count)
                         
-                        irc.reply(
-                            f"That link was already posted by {original_poster} {int(hours)}h {int(minutes)}m ago. "
-                            f"Repost count for {nick} is now {self.user_repost_count[cnick]}.",
-                            prefixNick=False,
-                        )
+                            irc.reply(
+                                f"That link was already posted by {original_poster} {int(hours)}h {int(minutes)}m ago. "
+                                f"Repost count for {nick} is now {count}.",
+                                prefixNick=False,
+                            )
                         
-                        # Log the repost
-                        self.log.info(f"Repost detected: {nick} reposted {clean_url} originally posted by {original_poster}")
+                            # Log the repost
+                            self.log.info("Repost detected: %s reposted %s originally posted by %s",
+                                          nick, clean_url, original_poster)
+                        else:
+                            self._record_link(clean_url, nick, current_time)
+                            self.log.debug("Updated timestamp for existing link: %s posted by %s",
+                                           clean_url, nick)
                     else:
-                        self.link_database[clean_url] = (nick, current_time)
-                        self.log.debug(f"Updated timestamp for existing link: {clean_url} posted by {nick}")
-                else:
-                    self.link_database[clean_url] = (nick, current_time)
-                    self.log.debug(f"Added new link to database: {clean_url} posted by {nick}")
+                        self._record_link(clean_url, nick, current_time)
+                        self.log.debug("Added new link to database: %s posted by %s", clean_url, nick)
 
-                self.save_data()  # Save after any modifications
+                    self._commit()  # Save after any modifications
 
     def reposters(self, irc, msg, args, nick=None):
         """[<nick>]
 
         Shows the top 15 reposters leaderboard. If <nick> is provided, shows that user's repost count and rank.
         """
-        if not self.user_repost_count:
-            irc.reply("No reposts have been recorded yet.", prefixNick=False)
-            return
-
-        # Sort users by repost count in descending order
-        sorted_reposters = sorted(self.user_repost_count.items(), key=lambda x: x[1], reverse=True)
-
-        if nick:
-            cnick = self._canonical_nick(nick)
-            if cnick in self.user_repost_count:
-                count = self.user_repost_count[cnick]
-                rank = next(i for i, (user, _) in enumerate(sorted_reposters, 1) if user == cnick)
-                irc.reply(f"{nick} has committed {count} repost{'s' if count != 1 else ''}, currently ranked {rank} among reposters.", prefixNick=False)
+        with self._lock:
+            if not self.user_repost_count:
+                irc.reply("No reposts have been recorded yet.", prefixNick=False)
+                return
+
+            if nick:
+                cnick = self._canonical_nick(nick)
+                if cnick in self.user_repost_count:
+                    count = self.user_repost_count[cnick]
+                    rank = bisect_left(self._leaderboard, (-count, cnick)) + 1
+                    irc.reply(f"{nick} has committed {count} repost{'s' if count != 1 else ''}, currently ranked {rank} among reposters.", prefixNick=False)
+                else:
+                    irc.reply(f"{nick} has not been caught linking any reposts.", prefixNick=False)
             else:
-                irc.reply(f"{nick} has not been caught linking any reposts.", prefixNick=False)
-        else:
-            # Get the top 15 reposters
-            top_reposters = sorted_reposters[:15]
+                # Get the top 15 reposters
+                top_reposters = self._leaderboard[:15]
 
-            # Format the leaderboard
-            leaderboard = ["Top 15 Reposters:"]
-            for user, count in top_reposters:
-                leaderboard.append(f"{user}:{count}")
+                # Format the leaderboard
+                leaderboard = ["Top 15 Reposters:"]
+                for neg_count, user in top_reposters:
+                    leaderboard.append(f"{user}:{-neg_count}")
 
-            # Join the leaderboard entries and reply
-            irc.reply(" ".join(leaderboard), prefixNick=False)
+                # Join the leaderboard entries and reply
+                irc.reply(" ".join(leaderboard), prefixNick=False)
 
     reposters = wrap(reposters, [optional('text')])
 
@@ -251,21 +499,27 @@ class RepostCount(callbacks.Plugin):
         if not ircdb.checkCapability(msg.prefix, 'owner'):
             irc.error("This command is limited to the bot owner.", Raise=True)
         
-        if option == 'all':
-            self.user_repost_count.clear()
-            self.link_database.clear()
-            irc.reply("All repost data has been purged.")
-        elif option:
-            copt = self._canonical_nick(option)
-            if copt in self.user_repost_count:
-                del self.user_repost_count[copt]
-                irc.reply(f"Repost count for {option} has been purged.")
+        with self._lock:
+            if option == 'all':
+                self.user_repost_count.clear()
+                self._leaderboard.clear()
+                self._link_poster.clear()
+                self._link_time.clear()
+                self._link_order.clear()
+                self._db.execute('DELETE FROM counts')
+                self._db.execute('DELETE FROM links')
+                self._commit()
+                irc.reply("All repost data has been purged.")
+            elif option:
+                copt = self._canonical_nick(option)
+                if copt in self.user_repost_count:
+                    self._set_count(copt, None)
+                    self._commit()
+                    irc.reply(f"Repost count for {option} has been purged.")
+                else:
+                    irc.error(f"No repost data found for {option}.")
             else:
-                irc.error(f"No repost data found for {option}.")
-        else:
-            irc.error("Please specify 'all' or a nickname to purge.")
-        
-        self.save_data()
+                irc.error("Please specify 'all' or a nickname to purge.")
 
     purge = wrap(purge, ['owner', optional('text')])
 
@@ -274,12 +528,13 @@ class RepostCount(callbacks.Plugin):
 
         Shows the current repost count for the specified nickname.
         """
-        cnick = self._canonical_nick(nick)
-        if cnick in self.user_repost_count:
-            count = self.user_repost_count[cnick]
-            irc.reply(f"{nick} has caused {count} repost{'s' if count != 1 else ''}.")
-        else:
-            irc.reply(f"{nick} has not caused any reposts.")
+        with self._lock:
+            cnick = self._canonical_nick(nick)
+            if cnick in self.user_repost_count:
+                count = self.user_repost_count[cnick]
+                irc.reply(f"{nick} has caused {count} repost{'s' if count != 1 else ''}.")
+            else:
+                irc.reply(f"{nick} has not caused any reposts.")
 
     repost = wrap(repost, ['text'])
 
@@ -291,7 +546,8 @@ class RepostCount(callbacks.Plugin):
         if not ircdb.checkCapability(msg.prefix, 'owner'):
             irc.error("This command is limited to the bot owner.", Raise=True)
 
-        ok, message = self._merge_alias(primary, alias)
+        with self._lock:
+            ok, message = self._merge_alias(primary, alias)
         if ok:
             irc.reply(message)
         else:
@@ -307,7 +563,8 @@ class RepostCount(callbacks.Plugin):
         if not ircdb.checkCapability(msg.prefix, 'owner'):
             irc.error("This command is limited to the bot owner.", Raise=True)
 
-        ok, message = self._remove_alias(alias)
+        with self._lock:
+            ok, message = self._remove_alias(alias)
         if ok:
             irc.reply(message)
         else:
@@ -322,12 +579,13 @@ class RepostCount(callbacks.Plugin):
         if not ircdb.checkCapability(msg.prefix, 'owner'):
             irc.error("This command is limited to the bot owner.", Raise=True)
 
-        if not self.alias_map:
-            irc.reply("No aliases configured.")
-            return
+        with self._lock:
+            if not self.alias_map:
+                irc.reply("No aliases configured.")
+                return
 
-        pairs = [f"{a}->{p}" for a, p in sorted(self.alias_map.items())]
-        irc.reply("Aliases: " + " ".join(pairs))
+            pairs = [f"{a}->{p}" for a, p in sorted(self.alias_map.items())]
+            irc.reply("Aliases: " + " ".join(pairs))
 
     aliases = wrap(aliases, ['owner'])
 